@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from langchain_core.messages import HumanMessage
+from langchain_core.messages.ai import AIMessageChunk
+from langchain_core.messages.tool import ToolMessage
+from core.agent import build_agent, probe_mcp_servers
+from core.config import load_config_from_json
+from core.streaming import StreamBuffer, chunk_text, produce_stream
+from utils import random_uuid
+
+# Serviço HTTP headless com o mesmo agente MCP da UI Streamlit.
+#
+#   uvicorn api_server:app --port 8600
+#   curl -N -X POST localhost:8600/chat -H 'Content-Type: application/json' \
+#        -d '{"message": "What time is it in Seoul?"}'
+#
+# AGENT_MODEL=fake usa o modelo falso local (sem chave de API) para testes de carga.
+
+load_dotenv(override=True)
+
+AGENT_MODEL = os.getenv("AGENT_MODEL", "gpt-4o-mini")
+AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", "120"))
+AGENT_RECURSION_LIMIT = int(os.getenv("AGENT_RECURSION_LIMIT", "100"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mcp_config = await probe_mcp_servers(load_config_from_json())
+    print(f"[INFO] Servidores MCP ativos: {', '.join(mcp_config) or 'nenhum'}")
+    connection, agent, tools = await build_agent(mcp_config, AGENT_MODEL)
+    app.state.agent = agent
+    app.state.tool_count = len(tools)
+    try:
+        yield
+    finally:
+        await connection.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class ChatRequest(BaseModel):
+    message: str
+    thread_id: Optional[str] = None
+    recursion_limit: int = AGENT_RECURSION_LIMIT
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "model": AGENT_MODEL, "tools": app.state.tool_count}
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    thread_id = request.thread_id or random_uuid()
+    config = {"recursion_limit": request.recursion_limit, "configurable": {"thread_id": thread_id}}
+    inputs = {"messages": [HumanMessage(content=request.message)]}
+
+    async def events():
+        buffer = StreamBuffer()
+        producer = asyncio.create_task(produce_stream(buffer, app.state.agent, inputs, config))
+        yield sse_event("start", {"thread_id": thread_id})
+        try:
+            async with asyncio.timeout(AGENT_TIMEOUT_SECONDS):
+                while (frames := await buffer.get_batch()) is not None:
+                    for message in frames:
+                        if isinstance(message, AIMessageChunk):
+                            text = chunk_text(message)
+                            if text:
+                                yield sse_event("token", {"text": text})
+                        elif isinstance(message, ToolMessage):
+                            yield sse_event("tool", {"name": message.name, "content": str(message.content)})
+            yield sse_event("done", {"thread_id": thread_id})
+        except Exception as e:
+            yield sse_event("error", {"thread_id": thread_id, "error": str(e) or type(e).__name__})
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,29 +1,30 @@
 import streamlit as st
 import asyncio
-import nest_asyncio
 import json
 import os
 import platform
 from dotenv import load_dotenv
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.runnables import RunnableConfig
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from utils import astream_graph, random_uuid
+from utils import random_uuid
+from core.checkpoint import get_checkpointer
+from core.constants import AUTO_MODEL_NAME
+from core.context import pop_context_report
+from core.history import HistoryStore, is_valid_thread_id
+from core.loop import run_sync
+from core.agent import McpConnection
+from core.metrics import metrics
+from core.model_router import resolve_tiers, tier_stats
+from core.prompt_cache import add_usage
+from core.response_cache import response_cache_stats
+from core.registry import acquire_connection, get_agent, is_connection_pooled, release_connection
+from core.tool_cache import cache_hit_rate
+from core.streaming import stream_graph_in_background, chunk_text
 from langchain_core.messages.ai import AIMessageChunk
 from langchain_core.messages.tool import ToolMessage
 
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-nest_asyncio.apply()
-
-if "event_loop" not in st.session_state:
-    loop = asyncio.new_event_loop()
-    st.session_state.event_loop = loop
-    asyncio.set_event_loop(loop)
 
 load_dotenv(override=True)
 
@@ -89,57 +90,43 @@ st.sidebar.divider()
 st.title("💬 MCP Tool Utilization Agent")
 st.markdown("✨ Ask questions to the ReAct agent that utilizes MCP tools.")
 
-SYSTEM_PROMPT = """<ROLE>
-You are a smart agent with an ability to use tools. 
-...
-</OUTPUT_FORMAT>
-"""
-
-OUTPUT_TOKEN_INFO = {
-    "gpt-4o-mini": {"max_tokens": 16000},
-    "claude-3-5-sonnet-latest": {"max_tokens": 8192},
-    "claude-3-5-haiku-latest": {"max_tokens": 8192},
-    "claude-3-7-sonnet-latest": {"max_tokens": 64000},
-    "gpt-4o": {"max_tokens": 16000},
-    "gpt-4o-mini-2024-07-18": {"max_tokens": 16000},
-}
-
 if "session_initialized" not in st.session_state:
     st.session_state.session_initialized = False
     st.session_state.agent = None
-    st.session_state.history = []
     st.session_state.mcp_client = None
     st.session_state.timeout_seconds = 120
     st.session_state.selected_model = "gpt-4o-mini"
     st.session_state.recursion_limit = 100
 
 if "thread_id" not in st.session_state:
-    st.session_state.thread_id = random_uuid()
+    # O thread_id fica na URL para que a conversa possa ser reaberta após reiniciar o servidor.
+    thread_id = st.query_params.get("thread")
+    st.session_state.thread_id = thread_id if is_valid_thread_id(thread_id) else random_uuid()
+    st.session_state.history = HistoryStore(st.session_state.thread_id)
+st.query_params["thread"] = st.session_state.thread_id
 
-async def cleanup_mcp_client():
+def cleanup_mcp_client():
     if "mcp_client" in st.session_state and st.session_state.mcp_client is not None:
         try:
-            await st.session_state.mcp_client.__aexit__(None, None, None)
+            run_sync(release_connection(st.session_state.mcp_client))
             st.session_state.mcp_client = None
         except Exception:
             pass
 
 def print_message():
+    messages = list(st.session_state.history)
     i = 0
-    while i < len(st.session_state.history):
-        message = st.session_state.history[i]
-        if message["role"] == "user":
-            st.chat_message("user", avatar="🧑‍💻").markdown(message["content"])
+    while i < len(messages):
+        message = messages[i]
+        if message.role == "user":
+            st.chat_message("user", avatar="🧑‍💻").markdown(message.content)
             i += 1
-        elif message["role"] == "assistant":
+        elif message.role == "assistant":
             with st.chat_message("assistant", avatar="🤖"):
-                st.markdown(message["content"])
-                if (
-                    i + 1 < len(st.session_state.history)
-                    and st.session_state.history[i + 1]["role"] == "assistant_tool"
-                ):
+                st.markdown(message.content)
+                if i + 1 < len(messages) and messages[i + 1].role == "assistant_tool":
                     with st.expander("🔧 Tool Call Information", expanded=False):
-                        st.markdown(st.session_state.history[i + 1]["content"])
+                        st.markdown(messages[i + 1].content)
                     i += 2
                 else:
                     i += 1
@@ -149,39 +136,50 @@ def print_message():
 def get_streaming_callback(text_placeholder, tool_placeholder):
     accumulated_text = []
     accumulated_tool = []
-
-    def callback_func(message: dict):
-        nonlocal accumulated_text, accumulated_tool
-        message_content = message.get("content", None)
-        if isinstance(message_content, AIMessageChunk):
-            content = message_content.content
-            if isinstance(content, str):
-                accumulated_text.append(content)
-                text_placeholder.markdown("".join(accumulated_text))
-        elif isinstance(message_content, ToolMessage):
-            accumulated_tool.append("\n```json\n" + str(message_content.content) + "\n```\n")
+    usage = {}
+
+    def callback_func(frames: list):
+        text_changed = tool_changed = False
+        for message_content in frames:
+            if isinstance(message_content, AIMessageChunk):
+                add_usage(usage, message_content)
+                content = chunk_text(message_content)
+                if content:
+                    accumulated_text.append(content)
+                    text_changed = True
+            elif isinstance(message_content, ToolMessage):
+                accumulated_tool.append("\n```json\n" + str(message_content.content) + "\n```\n")
+                tool_changed = True
+        if text_changed:
+            text_placeholder.markdown("".join(accumulated_text))
+        if tool_changed:
             with tool_placeholder.expander("🔧 Tool Call Information", expanded=True):
                 st.markdown("".join(accumulated_tool))
         return None
 
-    return callback_func, accumulated_text, accumulated_tool
+    return callback_func, accumulated_text, accumulated_tool, usage
 
-async def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
+def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
     try:
         if st.session_state.agent:
-            streaming_callback, acc_text, acc_tool = get_streaming_callback(text_placeholder, tool_placeholder)
-            response = await asyncio.wait_for(
-                astream_graph(
-                    st.session_state.agent,
-                    {"messages": [HumanMessage(content=query)]},
-                    callback=streaming_callback,
-                    config=RunnableConfig(
-                        recursion_limit=st.session_state.recursion_limit,
-                        thread_id=st.session_state.thread_id,
-                    ),
-                ),
+            streaming_callback, acc_text, acc_tool, usage = get_streaming_callback(text_placeholder, tool_placeholder)
+            config = RunnableConfig(
+                recursion_limit=st.session_state.recursion_limit,
+                configurable={"thread_id": st.session_state.thread_id},
+            )
+            messages = [HumanMessage(content=query)]
+            # Após reiniciar o processo o checkpoint em memória se perde: reidrata o
+            # agente com a janela do histórico persistido.
+            if not run_sync(st.session_state.agent.aget_state(config)).values:
+                messages = st.session_state.history.to_langchain_messages() + messages
+            response = stream_graph_in_background(
+                st.session_state.agent,
+                {"messages": messages},
+                render=streaming_callback,
+                config=config,
                 timeout=timeout_seconds,
             )
+            st.session_state.last_usage = usage
             return response, "".join(acc_text), "".join(acc_tool)
         else:
             return {"error": "🚫 Agent has not been initialized."}, "", ""
@@ -190,38 +188,49 @@ async def process_query(query, text_placeholder, tool_placeholder, timeout_secon
         return {"error": f"❌ Error occurred: {str(e)}\n{traceback.format_exc()}"}, "", ""
 
 
-
 import traceback
 
-async def initialize_session(mcp_config=None):
+def initialize_session(mcp_config=None):
     """
     Inicializa o cliente MCP e o agente, com logs por ferramenta.
     Exibe quais ferramentas foram carregadas e quais falharam.
     Gera logs no terminal para diagnóstico detalhado.
     """
     with st.spinner("🔄 Connecting to MCP server..."):
-        await cleanup_mcp_client()
+        # A conexão anterior só é liberada depois da nova ser adquirida, para que
+        # uma config inalterada reaproveite a conexão em vez de reabri-la.
+        previous_client = st.session_state.get("mcp_client")
 
         if mcp_config is None:
             mcp_config = load_config_from_json()
 
-        st.write("🧪 Testando ferramentas MCP individualmente...")
-
-        working_tools = {}
-
+        enabled_config = {}
         for name, config in mcp_config.items():
             if "tool_enabled_flags" in st.session_state:
                 if name in st.session_state.tool_enabled_flags and not st.session_state.tool_enabled_flags[name]:
                     print(f"[SKIP] Ferramenta `{name}` está desabilitada. Ignorando.")
                     continue
+            enabled_config[name] = config
+
+        working_tools = {}
+
+        if is_connection_pooled(enabled_config):
+            # Outra sessão já mantém essa conexão aberta: reaproveita sem testar de novo.
+            st.write("♻️ Reutilizando conexão MCP ativa...")
+            working_tools = enabled_config
+        else:
+            st.write("🧪 Testando ferramentas MCP individualmente...")
+
+        for name, config in enabled_config.items():
+            if name in working_tools:
+                continue
 
             st.write(f"🔌 Tentando subir: `{name}`...")
             print(f"[INFO] Iniciando carregamento da ferramenta MCP: {name}")
 
             try:
-                temp_client = MultiServerMCPClient({name: config})
-                await temp_client.__aenter__()
-                tools = temp_client.get_tools()
+                temp_client = McpConnection({name: config})
+                tools = run_sync(temp_client.start())
 
                 if tools:
                     st.success(f"✅ `{name}` carregada com sucesso.")
@@ -231,7 +240,7 @@ async def initialize_session(mcp_config=None):
                     st.warning(f"⚠️ `{name}` não retornou nenhuma ferramenta.")
                     print(f"[WARN] `{name}` não retornou ferramentas.")
                 
-                await temp_client.__aexit__(None, None, None)
+                run_sync(temp_client.close())
 
             except Exception as e:
                 st.error(f"❌ Falha ao carregar `{name}`: {e}")
@@ -247,32 +256,13 @@ async def initialize_session(mcp_config=None):
         st.write("🔁 Inicializando cliente final com ferramentas funcionais...")
 
         try:
-            final_client = MultiServerMCPClient(working_tools)
-            await final_client.__aenter__()
-            tools = final_client.get_tools()
-            st.session_state.tool_count = len(tools)
+            final_client = run_sync(acquire_connection(working_tools))
+            if previous_client is not None:
+                run_sync(release_connection(previous_client))
+            st.session_state.tool_count = len(final_client.tools)
             st.session_state.mcp_client = final_client
 
-            selected_model = st.session_state.selected_model
-            if selected_model.startswith("claude"):
-                model = ChatAnthropic(
-                    model=selected_model,
-                    temperature=0.1,
-                    max_tokens=OUTPUT_TOKEN_INFO[selected_model]["max_tokens"],
-                )
-            else:
-                model = ChatOpenAI(
-                    model=selected_model,
-                    temperature=0.1,
-                    max_tokens=OUTPUT_TOKEN_INFO[selected_model]["max_tokens"],
-                )
-
-            agent = create_react_agent(
-                model,
-                tools,
-                checkpointer=MemorySaver(),
-                prompt=SYSTEM_PROMPT,
-            )
+            agent = get_agent(st.session_state.selected_model, final_client)
 
             st.session_state.agent = agent
             st.session_state.session_initialized = True
@@ -301,6 +291,9 @@ with st.sidebar:
     if not available_models:
         st.warning("⚠️ API keys are not configured.")
         available_models = ["claude-3-7-sonnet-latest"]
+    elif all(resolve_tiers()):
+        # Modo de roteamento: cada pergunta vai para o nível rápido ou forte.
+        available_models.append(AUTO_MODEL_NAME)
 
     previous_model = st.session_state.selected_model
     st.session_state.selected_model = st.selectbox(
@@ -366,14 +359,56 @@ with st.sidebar:
     st.subheader("📊 Info")
     st.write(f"🛠️ Tools: {st.session_state.get('tool_count', '...')}")
     st.write(f"🧠 Model: {st.session_state.selected_model}")
+    if st.session_state.selected_model == AUTO_MODEL_NAME:
+        routing = tier_stats()
+        for tier in ("fast", "strong"):
+            if tier in routing:
+                stats = routing[tier]
+                st.write(
+                    f"🚦 {tier.capitalize()} tier: {stats['calls']} calls, {stats['avg_latency_s']:.2f}s avg, "
+                    f"{stats['avg_input_tokens']:.0f} in / {stats['avg_output_tokens']:.0f} out tokens avg"
+                )
+        if routing["escalations"]:
+            st.write(f"⬆️ Escalations: {routing['escalations']}")
+    hedge = metrics.snapshot("hedge.")
+    if hedge.get("hedge.requests"):
+        st.write(
+            f"🏁 Hedging: {int(hedge.get('hedge.fired', 0))} hedged, {int(hedge.get('hedge.failovers', 0))} failovers, "
+            f"{int(hedge.get('hedge.backup_wins', 0))} backup wins of {int(hedge['hedge.requests'])} calls"
+        )
+    context_report = st.session_state.get("context_report")
+    if context_report:
+        saved = context_report["tokens_before"] - context_report["tokens_after"]
+        st.write(f"🧹 Context trimmed (last turn): ~{saved} tokens saved over {context_report['steps']} step(s)")
+    tool_cache_hits, tool_cache_total = cache_hit_rate()
+    if tool_cache_total:
+        st.write(f"♻️ Tool cache: {tool_cache_hits}/{tool_cache_total} hits ({tool_cache_hits / tool_cache_total:.0%})")
+    response_cache = response_cache_stats()
+    if response_cache["lookups"]:
+        st.write(
+            f"⚡ Response cache: {response_cache['hits']}/{response_cache['lookups']} hits "
+            f"({response_cache['hits'] / response_cache['lookups']:.0%}, {response_cache['semantic_hits']} semantic), "
+            f"~{response_cache['latency_saved_s']:.1f}s saved"
+        )
+    loop_guard = metrics.snapshot("loop_guard.")
+    if loop_guard:
+        st.write(
+            f"🔂 Loop guard: {int(loop_guard.get('loop_guard.repeated_calls', 0))} repeated calls, "
+            f"{int(loop_guard.get('loop_guard.wasted_iterations', 0))} wasted iterations, "
+            f"{int(loop_guard.get('loop_guard.stopped_turns', 0))} turns stopped"
+        )
+    last_usage = st.session_state.get("last_usage")
+    if last_usage and last_usage.get("input_tokens"):
+        st.write(
+            f"💾 Prompt cache (last turn): {last_usage['cache_read']} read / "
+            f"{last_usage['cache_creation']} written of {last_usage['input_tokens']} input tokens"
+        )
 
     if st.button("Apply Settings", type="primary"):
         save_config_to_json(st.session_state.pending_mcp_config)
         st.session_state.agent = None
         st.session_state.session_initialized = False
-        success = st.session_state.event_loop.run_until_complete(
-            initialize_session(st.session_state.pending_mcp_config)
-        )
+        success = initialize_session(st.session_state.pending_mcp_config)
         if success:
             st.success("✅ Settings applied.")
         else:
@@ -381,8 +416,9 @@ with st.sidebar:
         st.rerun()
 
     if st.button("Reset Conversation", type="secondary"):
+        get_checkpointer().delete_thread(st.session_state.thread_id)
         st.session_state.thread_id = random_uuid()
-        st.session_state.history = []
+        st.session_state.history = HistoryStore(st.session_state.thread_id)
         st.rerun()
 
     if use_login and st.session_state.authenticated:
@@ -412,16 +448,17 @@ if send_button and user_query.strip():
         with st.chat_message("assistant", avatar="🤖"):
             tool_placeholder = st.empty()
             text_placeholder = st.empty()
-            resp, final_text, final_tool = st.session_state.event_loop.run_until_complete(
-                process_query(user_query, text_placeholder, tool_placeholder, st.session_state.timeout_seconds)
+            resp, final_text, final_tool = process_query(
+                user_query, text_placeholder, tool_placeholder, st.session_state.timeout_seconds
             )
         if "error" in resp:
             st.error(resp["error"])
         else:
-            st.session_state.history.append({"role": "user", "content": user_query})
-            st.session_state.history.append({"role": "assistant", "content": final_text})
+            st.session_state.history.append("user", user_query)
+            st.session_state.history.append("assistant", final_text)
             if final_tool.strip():
-                st.session_state.history.append({"role": "assistant_tool", "content": final_tool})
+                st.session_state.history.append("assistant_tool", final_tool)
+            st.session_state.context_report = pop_context_report(st.session_state.thread_id)
             st.rerun()
     else:
         st.warning("⚠️ Please click 'Apply Settings' first.")
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from langchain_core.messages.ai import AIMessageChunk
+from langchain_core.messages.tool import ToolMessage
+from core.agent import build_agent, probe_mcp_servers
+from core.streaming import chunk_text
+from utils import astream_graph, random_uuid
+
+# Executa um lote de perguntas (JSONL) contra o mesmo agente da UI, em paralelo.
+#
+#   python batch_runner.py queries.jsonl results.jsonl --concurrency 8 --timeout 120
+#
+# Cada linha de entrada é {"id": ..., "query": "..."} (ou apenas uma string JSON).
+# Cada linha de saída traz a resposta, o status e os tempos da pergunta.
+
+
+def read_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            item.setdefault("id", index)
+            yield index, item
+
+
+async def run_query(agent, index, item, semaphore, timeout, recursion_limit):
+    async with semaphore:
+        query = item.get("query") or item.get("question") or ""
+        config = {"recursion_limit": recursion_limit, "configurable": {"thread_id": random_uuid()}}
+        answer = []
+        tool_calls = 0
+        first_token = None
+        start = time.perf_counter()
+
+        def on_message(message):
+            nonlocal tool_calls, first_token
+            content = message["content"]
+            if isinstance(content, AIMessageChunk):
+                text = chunk_text(content)
+                if text:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    answer.append(text)
+            elif isinstance(content, ToolMessage):
+                tool_calls += 1
+
+        status, error = "ok", None
+        try:
+            await asyncio.wait_for(
+                astream_graph(agent, {"messages": [HumanMessage(content=query)]}, config=config, callback=on_message),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"Query exceeded {timeout} seconds."
+        except Exception as e:
+            status, error = "error", str(e)
+        finally:
+            # As threads do lote são descartáveis; não deixa checkpoints para trás.
+            await agent.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+
+        return {
+            "id": item["id"],
+            "index": index,
+            "query": query,
+            "status": status,
+            "error": error,
+            "answer": "".join(answer),
+            "tool_calls": tool_calls,
+            "ttft_s": round(first_token, 3) if first_token is not None else None,
+            "latency_s": round(time.perf_counter() - start, 3),
+        }
+
+
+async def main(args):
+    with open(args.config, "r", encoding="utf-8") as f:
+        mcp_config = await probe_mcp_servers(json.load(f))
+    print(f"[INFO] Servidores MCP ativos: {', '.join(mcp_config) or 'nenhum'}")
+
+    # Um único pool de conexões MCP e um único agente compartilhados por todas as perguntas;
+    # cada pergunta usa seu próprio thread_id.
+    connection, agent, tools = await build_agent(mcp_config, args.model)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    started = time.perf_counter()
+    latencies = []
+    failures = 0
+    try:
+        tasks = [
+            run_query(agent, index, item, semaphore, args.timeout, args.recursion_limit)
+            for index, item in read_queries(args.input)
+        ]
+        with open(args.output, "w", encoding="utf-8") as out:
+            for done, coro in enumerate(asyncio.as_completed(tasks), start=1):
+                result = await coro
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                latencies.append(result["latency_s"])
+                failures += result["status"] != "ok"
+                print(f"[{done}/{len(tasks)}] {result['id']}: {result['status']} ({result['latency_s']}s)")
+    finally:
+        await connection.close()
+
+    elapsed = time.perf_counter() - started
+    if latencies:
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"\n{len(latencies)} queries in {elapsed:.1f}s ({len(latencies) / elapsed:.2f} q/s), "
+            f"{failures} failed, p50 {statistics.median(latencies):.2f}s, p95 {p95:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description="Run a JSONL batch of queries against the MCP agent.")
+    parser.add_argument("input", help="JSONL file with one query per line")
+    parser.add_argument("output", help="JSONL file to stream results into")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--config", default="config.json", help="MCP servers configuration")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=120, help="Per-query timeout in seconds")
+    parser.add_argument("--recursion-limit", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
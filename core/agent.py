@@ -0,0 +1,164 @@
+import asyncio
+import os
+from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_anthropic import ChatAnthropic
+from langchain_openai import ChatOpenAI
+from langgraph.prebuilt import create_react_agent
+from core.checkpoint import get_checkpointer
+from core.constants import (
+    AUTO_MODEL_NAME,
+    LLM_HEDGE_BACKUP_MODEL,
+    LOOP_GUARD_MAX_REPEATS,
+    OUTPUT_TOKEN_INFO,
+    RESPONSE_CACHE_DB,
+)
+from core.context import make_context_hook
+from core.fake_llm import FakeStreamingChatModel
+from core.hedge import HedgedChatModel
+from core.loop_guard import make_loop_guard_hook
+from core.model_router import ModelRouter, resolve_tiers
+from core.prompt_cache import bind_tools_for_caching, build_system_prompt, sort_tools
+from core.response_cache import ResponseCache
+from core.tool_cache import split_cache_policies, wrap_tools
+from core.tool_router import ToolRouter, should_route_tools
+
+# Construção do cliente MCP, do modelo e do agente, sem dependência do Streamlit.
+# Usado pela UI (core/session.py, app.py) e pelos pontos de entrada headless.
+
+
+class McpConnection:
+    """
+    Mantém um MultiServerMCPClient aberto numa task dedicada do loop de fundo.
+
+    O cliente MCP (anyio) precisa ser aberto e fechado na mesma task, então a
+    conexão vive numa task própria até close() ser chamado.
+    """
+
+    def __init__(self, mcp_config):
+        self.mcp_config = mcp_config
+        self.client = None
+        self.tools = []
+        self._stop = None
+        self._task = None
+
+    async def start(self):
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready
+        return self.tools
+
+    async def _run(self, ready):
+        try:
+            connections, cache_policies = split_cache_policies(self.mcp_config)
+            async with MultiServerMCPClient(connections) as client:
+                self.client = client
+                self.tools = wrap_tools(client.server_name_to_tools, cache_policies)
+                ready.set_result(None)
+                await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"[WARN] Erro ao encerrar cliente MCP: {e}")
+        finally:
+            self.client = None
+
+    async def close(self):
+        if self._stop is not None:
+            self._stop.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def probe_mcp_servers(mcp_config):
+    """Testa cada servidor em paralelo e devolve apenas a configuração dos que carregaram ferramentas."""
+
+    async def probe(name, config):
+        connection = McpConnection({name: config})
+        try:
+            tools = await connection.start()
+        except Exception as e:
+            print(f"[ERRO] Falha ao carregar servidor MCP: {name} ({e})")
+            return False
+        await connection.close()
+        if not tools:
+            print(f"[WARN] `{name}` não retornou ferramentas.")
+        return bool(tools)
+
+    names = list(mcp_config)
+    results = await asyncio.gather(*(probe(name, mcp_config[name]) for name in names))
+    return {name: mcp_config[name] for name, ok in zip(names, results) if ok}
+
+
+def create_model(selected_model):
+    if selected_model == AUTO_MODEL_NAME:
+        fast_name, strong_name = resolve_tiers()
+        if not fast_name or not strong_name:
+            raise ValueError("Routing mode needs an API key for one fast and one strong model.")
+        model = ModelRouter(_create_hedged_model(fast_name), _create_hedged_model(strong_name), fast_name, strong_name)
+    else:
+        model = _create_hedged_model(selected_model)
+    if RESPONSE_CACHE_DB:
+        return ResponseCache(model, selected_model)
+    return model
+
+
+def _create_hedged_model(selected_model):
+    model = _create_chat_model(selected_model)
+    if LLM_HEDGE_BACKUP_MODEL and LLM_HEDGE_BACKUP_MODEL != selected_model:
+        try:
+            backup = _create_chat_model(LLM_HEDGE_BACKUP_MODEL)
+        except Exception as e:
+            print(f"[WARN] Modelo reserva `{LLM_HEDGE_BACKUP_MODEL}` indisponível, sem hedging: {e}")
+            return model
+        return HedgedChatModel(
+            primary=model, backup=backup, primary_name=selected_model, backup_name=LLM_HEDGE_BACKUP_MODEL
+        )
+    return model
+
+
+def _create_chat_model(selected_model):
+    if selected_model.startswith("fake"):
+        return FakeStreamingChatModel(
+            latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+            latencies=[float(v) for v in os.getenv("FAKE_LLM_LATENCIES", "").split(",") if v],
+            token_delay=float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0")),
+        )
+    if selected_model.startswith("claude"):
+        return ChatAnthropic(
+            model=selected_model,
+            temperature=0.1,
+            max_tokens=OUTPUT_TOKEN_INFO[selected_model]["max_tokens"],
+        )
+    return ChatOpenAI(
+        model=selected_model,
+        temperature=0.1,
+        max_tokens=OUTPUT_TOKEN_INFO[selected_model]["max_tokens"],
+        stream_usage=True,
+    )
+
+
+def create_agent(model, tools, checkpointer=None, model_name=None):
+    tools = sort_tools(tools)
+    if should_route_tools(tools):
+        router = ToolRouter(model, tools, model_name)
+        bound_model, tools = router, tools + [router.find_tools]
+    else:
+        bound_model = bind_tools_for_caching(model, tools, model_name)
+    return create_react_agent(
+        bound_model,
+        tools,
+        checkpointer=checkpointer if checkpointer is not None else get_checkpointer(),
+        prompt=build_system_prompt(model_name),
+        pre_model_hook=make_context_hook(model_name),
+        post_model_hook=make_loop_guard_hook() if LOOP_GUARD_MAX_REPEATS > 0 else None,
+    )
+
+
+async def build_agent(mcp_config, selected_model, checkpointer=None):
+    """Conecta aos servidores MCP e monta o agente ReAct; devolve (conexão, agente, ferramentas)."""
+    connection = McpConnection(mcp_config)
+    tools = await connection.start()
+    agent = create_agent(create_model(selected_model), tools, checkpointer, model_name=selected_model)
+    return connection, agent, tools
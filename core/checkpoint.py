@@ -0,0 +1,375 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Iterator, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.types import TASKS
+from core.constants import (
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_DB,
+    CHECKPOINT_MAX_PER_THREAD,
+    CHECKPOINT_THREAD_TTL,
+    CHECKPOINT_VACUUM_INTERVAL,
+)
+from core.loop import submit
+
+# Payloads maiores que isso são gravados comprimidos com zlib.
+_COMPRESS_THRESHOLD = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer em SQLite local (modo WAL) com política de retenção.
+
+    Mantém no máximo `max_per_thread` checkpoints por thread e apaga threads sem
+    atividade há mais de `thread_ttl` segundos quando vacuum() roda. Os dados são
+    serializados com o serde do LangGraph e comprimidos quando grandes.
+    """
+
+    def __init__(self, path=CHECKPOINT_DB, max_per_thread=CHECKPOINT_MAX_PER_THREAD, thread_ttl=CHECKPOINT_THREAD_TTL, *, serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.max_per_thread = max_per_thread
+        self.thread_ttl = thread_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- serialização ---
+
+    def _dumps(self, obj):
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) > _COMPRESS_THRESHOLD:
+            return type_ + "+z", zlib.compress(data)
+        return type_, data
+
+    def _loads(self, type_, data):
+        if type_.endswith("+z"):
+            type_, data = type_[:-2], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # --- leitura ---
+
+    def _row_to_tuple(self, thread_id, checkpoint_ns, row):
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint = self._loads(type_, checkpoint_blob)
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        if "pending_sends" in checkpoint and parent_checkpoint_id:
+            sends = self._conn.execute(
+                "SELECT type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? AND channel = ? "
+                "ORDER BY task_path, task_id, idx",
+                (thread_id, checkpoint_ns, parent_checkpoint_id, TASKS),
+            ).fetchall()
+            checkpoint["pending_sends"] = [self._loads(t, v) for t, v in sends]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self._loads(metadata_type, metadata_blob),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self._loads(t, v)) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._row_to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                item = self._row_to_tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(item)
+        yield from results
+
+    # --- escrita ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_copy = checkpoint.copy()
+        if "pending_sends" in checkpoint_copy:
+            # Reconstruído na leitura a partir das escritas TASKS do checkpoint pai.
+            checkpoint_copy["pending_sends"] = []
+        type_, data = self._dumps(checkpoint_copy)
+        metadata_type, metadata_data = self._dumps(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        checkpoint["id"],
+                        config["configurable"].get("checkpoint_id"),
+                        type_,
+                        data,
+                        metadata_type,
+                        metadata_data,
+                    ),
+                )
+                self._conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time()))
+                self._prune_thread(thread_id, checkpoint_ns)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        regular, special = [], []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, data = self._dumps(value)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, type_, data, task_path)
+            (special if write_idx < 0 else regular).append(row)
+        # Todas as escritas de uma task entram numa única transação.
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if regular:
+                    self._conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", regular)
+                if special:
+                    self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", special)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _prune_thread(self, thread_id, checkpoint_ns):
+        if not self.max_per_thread:
+            return
+        row = self._conn.execute(
+            "SELECT checkpoint_id, parent_checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_per_thread - 1),
+        ).fetchone()
+        if row is None:
+            return
+        oldest_kept, parent = row
+        self._conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, oldest_kept),
+        )
+        # As escritas TASKS do pai do checkpoint mais antigo mantido reconstroem seu
+        # pending_sends; só as anteriores ao pai podem sair.
+        self._conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, min(parent, oldest_kept) if parent else oldest_kept),
+        )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for table in ("checkpoints", "writes", "threads"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def vacuum(self):
+        """Apaga threads expiradas pelo TTL e devolve o espaço livre ao sistema de arquivos."""
+        expired = []
+        if self.thread_ttl:
+            with self._lock:
+                expired = [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT thread_id FROM threads WHERE updated_at < ?", (time.time() - self.thread_ttl,)
+                    )
+                ]
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+        with self._lock:
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return len(expired)
+
+    # --- variantes assíncronas: o SQLite roda numa thread para não travar o loop ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path="") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+async def _vacuum_periodically(saver, interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await asyncio.to_thread(saver.vacuum)
+            if removed:
+                print(f"[INFO] Checkpointer: {removed} thread(s) expirada(s) removida(s).")
+        except Exception as e:
+            print(f"[WARN] Falha no vacuum do checkpointer: {e}")
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Checkpointer compartilhado pelo processo, escolhido por CHECKPOINT_BACKEND (sqlite ou memory)."""
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            if CHECKPOINT_BACKEND == "memory":
+                _checkpointer = MemorySaver()
+            elif CHECKPOINT_BACKEND == "sqlite":
+                _checkpointer = SQLiteCheckpointSaver()
+                if CHECKPOINT_VACUUM_INTERVAL:
+                    submit(_vacuum_periodically(_checkpointer, CHECKPOINT_VACUUM_INTERVAL))
+            else:
+                raise ValueError(f"Invalid CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND}. Must be 'sqlite' or 'memory'.")
+    return _checkpointer
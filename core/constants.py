@@ -1,3 +1,5 @@
+import os
+
 SYSTEM_PROMPT = """<ROLE>
 You are a smart agent with an ability to use tools. 
 ...
@@ -5,10 +7,83 @@ You are a smart agent with an ability to use tools.
 """
 
 OUTPUT_TOKEN_INFO = {
-    "gpt-4o-mini": {"max_tokens": 16000},
-    "claude-3-5-sonnet-latest": {"max_tokens": 8192},
-    "claude-3-5-haiku-latest": {"max_tokens": 8192},
-    "claude-3-7-sonnet-latest": {"max_tokens": 64000},
-    "gpt-4o": {"max_tokens": 16000},
-    "gpt-4o-mini-2024-07-18": {"max_tokens": 16000},
+    "gpt-4o-mini": {"max_tokens": 16000, "context_window": 128000},
+    "claude-3-5-sonnet-latest": {"max_tokens": 8192, "context_window": 200000},
+    "claude-3-5-haiku-latest": {"max_tokens": 8192, "context_window": 200000},
+    "claude-3-7-sonnet-latest": {"max_tokens": 64000, "context_window": 200000},
+    "gpt-4o": {"max_tokens": 16000, "context_window": 128000},
+    "gpt-4o-mini-2024-07-18": {"max_tokens": 16000, "context_window": 128000},
 }
+
+# Fila entre o produtor (grafo) e o consumidor (UI) durante o streaming.
+# Políticas quando o consumidor atrasa: "merge" funde deltas de texto,
+# "drop" descarta frames intermediários sem texto, "block" aplica só backpressure.
+# Resultados de ferramentas nunca são descartados.
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+STREAM_OVERFLOW_POLICY = os.getenv("STREAM_OVERFLOW_POLICY", "merge")
+STREAM_RENDER_INTERVAL = float(os.getenv("STREAM_RENDER_INTERVAL", "0.05"))
+
+# Histórico da conversa persistido em disco (um JSONL por thread_id).
+HISTORY_DIR = os.getenv("HISTORY_DIR", ".history")
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", "50"))
+
+# Checkpointer do agente: "sqlite" (durável, com retenção) ou "memory".
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", ".checkpoints.sqlite")
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("CHECKPOINT_MAX_PER_THREAD", "20"))
+CHECKPOINT_THREAD_TTL = float(os.getenv("CHECKPOINT_THREAD_TTL", str(7 * 24 * 3600)))
+CHECKPOINT_VACUUM_INTERVAL = float(os.getenv("CHECKPOINT_VACUUM_INTERVAL", "600"))
+
+# Gestão da janela de contexto: o estado enviado ao modelo fica abaixo de
+# min(context_window - max_tokens, CONTEXT_TOKEN_BUDGET) tokens estimados.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "32000"))
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "3"))
+
+# Cache de resultados de ferramentas MCP (política por servidor no config.json).
+# TOOL_CACHE_DB vazio desativa a camada em disco.
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "2048"))
+TOOL_CACHE_DB = os.getenv("TOOL_CACHE_DB", "")
+
+# Roteador de ferramentas: com mais de TOOL_ROUTER_MIN_TOOLS ferramentas, cada
+# chamada ao modelo recebe só as TOOL_ROUTER_TOP_K mais relevantes para a pergunta,
+# as fixadas em TOOL_ROUTER_PINNED (nomes separados por vírgula) e `find_tools`.
+# TOOL_ROUTER_TOP_K=0 desativa o roteamento.
+TOOL_ROUTER_TOP_K = int(os.getenv("TOOL_ROUTER_TOP_K", "8"))
+TOOL_ROUTER_MIN_TOOLS = int(os.getenv("TOOL_ROUTER_MIN_TOOLS", "24"))
+TOOL_ROUTER_PINNED = [name for name in os.getenv("TOOL_ROUTER_PINNED", "").split(",") if name]
+
+# Roteamento por custo/latência (modelo "auto"): cada pergunta vai para o primeiro
+# modelo disponível do nível rápido ou do forte; o turno sobe para o nível forte
+# se o rápido falhar, repetir chamadas ou passar de MODEL_ROUTER_FAST_MAX_STEPS passos.
+AUTO_MODEL_NAME = "auto"
+MODEL_ROUTER_FAST = os.getenv("MODEL_ROUTER_FAST", "gpt-4o-mini,claude-3-5-haiku-latest").split(",")
+MODEL_ROUTER_STRONG = os.getenv("MODEL_ROUTER_STRONG", "claude-3-7-sonnet-latest,gpt-4o").split(",")
+MODEL_ROUTER_MAX_QUERY_CHARS = int(os.getenv("MODEL_ROUTER_MAX_QUERY_CHARS", "280"))
+MODEL_ROUTER_FAST_MAX_STEPS = int(os.getenv("MODEL_ROUTER_FAST_MAX_STEPS", "4"))
+
+# Hedging de chamadas ao modelo (opcional): se o primeiro token não chegar em
+# LLM_HEDGE_AFTER segundos, a mesma chamada é feita a LLM_HEDGE_BACKUP_MODEL e vence
+# quem começar a responder primeiro. LLM_HEDGE_AFTER=0 usa o p95 observado do
+# tempo até o primeiro token (LLM_HEDGE_DEFAULT_AFTER até haver amostras suficientes).
+LLM_HEDGE_BACKUP_MODEL = os.getenv("LLM_HEDGE_BACKUP_MODEL", "")
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+LLM_HEDGE_DEFAULT_AFTER = float(os.getenv("LLM_HEDGE_DEFAULT_AFTER", "3"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Cache de respostas do modelo (opcional; RESPONSE_CACHE_DB vazio desativa).
+# Só respostas finais, sem chamadas de ferramenta, são guardadas. A camada semântica
+# vale para a primeira pergunta da conversa e fica desligada por padrão: o vetor local
+# compara palavras, não significado, e perguntas que diferem só numa entidade (produto,
+# data, nome) podem passar do limiar. Para ligar, defina RESPONSE_CACHE_SEMANTIC_THRESHOLD
+# (ex.: 0.92), de preferência com RESPONSE_CACHE_EMBEDDING_MODEL (embeddings da OpenAI).
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(24 * 3600)))
+RESPONSE_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("RESPONSE_CACHE_SEMANTIC_THRESHOLD", "0"))
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv("RESPONSE_CACHE_EMBEDDING_MODEL", "")
+RESPONSE_CACHE_REPLAY_DELAY = float(os.getenv("RESPONSE_CACHE_REPLAY_DELAY", "0.005"))
+
+# Detecção de laços no agente: chamadas de ferramenta repetidas (mesmo nome e
+# argumentos) no mesmo turno recebem o resultado anterior com um aviso, sem executar
+# de novo; passando de LOOP_GUARD_MAX_REPEATS repetições o turno é encerrado com a
+# resposta parcial. 0 desativa.
+LOOP_GUARD_MAX_REPEATS = int(os.getenv("LOOP_GUARD_MAX_REPEATS", "3"))
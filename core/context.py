@@ -0,0 +1,131 @@
+import json
+import threading
+from collections import OrderedDict
+from langchain_core.messages import HumanMessage
+from core.constants import CONTEXT_KEEP_TURNS, CONTEXT_TOKEN_BUDGET, OUTPUT_TOKEN_INFO
+from core.metrics import metrics
+
+# Saídas de ferramenta menores que isso (em tokens estimados) não valem o stub.
+_STUB_MIN_TOKENS = 200
+_SUMMARY_MAX_LINES = 60
+_SUMMARY_LINE_CHARS = 200
+
+# Resumos de corte por thread, até serem lidos por pop_context_report. Só a UI lê;
+# a API e o batch nunca leem, então o dict é um LRU limitado para não crescer sem fim.
+_MAX_REPORTS = 256
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+
+
+def _message_text(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+
+def estimate_tokens(messages):
+    """Estimativa barata (~4 caracteres por token), suficiente para decidir cortes."""
+    total = 0
+    for message in messages:
+        total += len(_message_text(message)) // 4 + 4
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            total += len(json.dumps(tool_call.get("args", {}), default=str)) // 4 + 8
+    return total
+
+
+def get_context_budget(model_name):
+    info = OUTPUT_TOKEN_INFO.get(model_name)
+    if not info or "context_window" not in info:
+        return CONTEXT_TOKEN_BUDGET
+    return min(info["context_window"] - info["max_tokens"], CONTEXT_TOKEN_BUDGET)
+
+
+def _stub(message):
+    if message.type != "tool" or estimate_tokens([message]) < _STUB_MIN_TOKENS:
+        return message
+    size = len(_message_text(message))
+    return message.model_copy(
+        update={"content": f"[Output of tool `{message.name}` omitted to save context ({size} chars).]"}
+    )
+
+
+def _clip(text):
+    text = " ".join(text.split())
+    return text if len(text) <= _SUMMARY_LINE_CHARS else text[:_SUMMARY_LINE_CHARS] + "…"
+
+
+def _summarize(messages):
+    lines = []
+    for message in messages:
+        if message.type == "human":
+            lines.append(f"- User: {_clip(_message_text(message))}")
+        elif message.type == "ai":
+            text = message.content if isinstance(message.content, str) else ""
+            if text.strip():
+                lines.append(f"- Assistant: {_clip(text)}")
+            if message.tool_calls:
+                lines.append(f"- Assistant called: {', '.join(tc['name'] for tc in message.tool_calls)}")
+    omitted = len(lines) - _SUMMARY_MAX_LINES
+    if omitted > 0:
+        lines = [f"- ({omitted} earlier entries omitted)"] + lines[-_SUMMARY_MAX_LINES:]
+    return HumanMessage(content="[Summary of the earlier conversation]\n" + "\n".join(lines))
+
+
+def fit_messages_to_budget(messages, budget, keep_turns=CONTEXT_KEEP_TURNS):
+    """
+    Reduz a lista de mensagens até caber no orçamento, em etapas:
+    1) troca saídas antigas de ferramentas por stubs curtos;
+    2) condensa a conversa anterior às últimas `keep_turns` perguntas num resumo;
+    3) se ainda não couber, faz stub das saídas recentes, exceto as do passo atual.
+    """
+    if estimate_tokens(messages) <= budget:
+        return messages
+
+    human_indexes = [i for i, m in enumerate(messages) if m.type == "human"]
+    cut = human_indexes[-keep_turns] if keep_turns and len(human_indexes) >= keep_turns else 0
+    older, recent = messages[:cut], messages[cut:]
+
+    older = [_stub(m) for m in older]
+    if estimate_tokens(older) + estimate_tokens(recent) <= budget:
+        return older + recent
+
+    head = [_summarize(older)] if older else []
+    if estimate_tokens(head) + estimate_tokens(recent) <= budget:
+        return head + recent
+
+    ai_indexes = [i for i, m in enumerate(recent) if m.type == "ai"]
+    last_ai = ai_indexes[-1] if ai_indexes else len(recent)
+    recent = [_stub(m) if i < last_ai else m for i, m in enumerate(recent)]
+    return head + recent
+
+
+def make_context_hook(model_name):
+    """Cria o pre_model_hook do agente, que mantém a entrada do modelo dentro do orçamento."""
+    budget = get_context_budget(model_name)
+
+    def pre_model_hook(state, config):
+        messages = state["messages"]
+        fitted = fit_messages_to_budget(messages, budget)
+        if fitted is not messages:
+            before, after = estimate_tokens(messages), estimate_tokens(fitted)
+            metrics.incr("context.trimmed_steps")
+            metrics.incr("context.tokens_saved", before - after)
+            thread_id = config.get("configurable", {}).get("thread_id")
+            with _reports_lock:
+                report = _reports.setdefault(thread_id, {"steps": 0, "tokens_before": 0, "tokens_after": 0})
+                _reports.move_to_end(thread_id)
+                while len(_reports) > _MAX_REPORTS:
+                    _reports.popitem(last=False)
+                report["steps"] += 1
+                report["tokens_before"] += before
+                report["tokens_after"] += after
+        return {"llm_input_messages": fitted}
+
+    return pre_model_hook
+
+
+def pop_context_report(thread_id):
+    """Devolve (e zera) o resumo de cortes da thread desde a última consulta, ou None."""
+    with _reports_lock:
+        return _reports.pop(thread_id, None)
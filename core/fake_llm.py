@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Modelo de chat falso para testes de carga e desenvolvimento sem chaves de API.
+
+    Devolve as respostas em ciclo, emitindo uma palavra por chunk. `latency` atrasa o
+    primeiro token e `token_delay` espaça os seguintes, simulando um provedor real.
+    `latencies`, se definido, substitui `latency` chamada a chamada (em ciclo), para
+    simular períodos de lentidão do provedor.
+    """
+
+    responses: List[str] = ["This is a fake response from the local test model."]
+    latency: float = 0.0
+    latencies: List[float] = []
+    token_delay: float = 0.0
+    _index: int = PrivateAttr(default=0)
+    _calls: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _next_latency(self) -> float:
+        if not self.latencies:
+            return self.latency
+        latency = self.latencies[self._calls % len(self.latencies)]
+        self._calls += 1
+        return latency
+
+    def _next_response(self) -> str:
+        response = self.responses[self._index % len(self.responses)]
+        self._index += 1
+        return response
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._next_latency())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._next_response()))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        await asyncio.sleep(self._next_latency())
+        words = self._next_response().split(" ")
+        for i, word in enumerate(words):
+            if i > 0 and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            token = word if i == len(words) - 1 else word + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = ""
+        async for chunk in self._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            text += chunk.message.content
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def bind_tools(self, tools, **kwargs: Any):
+        # O modelo falso nunca chama ferramentas; aceitar o bind mantém o create_react_agent feliz.
+        return self
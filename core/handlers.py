@@ -2,22 +2,25 @@ import streamlit as st
 from langchain_core.messages import HumanMessage
 from langchain_core.messages.ai import AIMessageChunk
 from langchain_core.messages.tool import ToolMessage
-from utils import astream_graph
+from core.prompt_cache import add_usage
+from core.streaming import stream_graph_in_background, chunk_text
 from langchain_core.runnables import RunnableConfig
+from core.loop import run_sync
 
 def print_message():
+    messages = list(st.session_state.history)
     i = 0
-    while i < len(st.session_state.history):
-        message = st.session_state.history[i]
-        if message["role"] == "user":
-            st.chat_message("user", avatar="🧑‍💻").markdown(message["content"])
+    while i < len(messages):
+        message = messages[i]
+        if message.role == "user":
+            st.chat_message("user", avatar="🧑‍💻").markdown(message.content)
             i += 1
-        elif message["role"] == "assistant":
+        elif message.role == "assistant":
             with st.chat_message("assistant", avatar="🤖"):
-                st.markdown(message["content"])
-                if i + 1 < len(st.session_state.history) and st.session_state.history[i + 1]["role"] == "assistant_tool":
+                st.markdown(message.content)
+                if i + 1 < len(messages) and messages[i + 1].role == "assistant_tool":
                     with st.expander("🔧 Tool Call Information", expanded=False):
-                        st.markdown(st.session_state.history[i + 1]["content"])
+                        st.markdown(messages[i + 1].content)
                     i += 2
                 else:
                     i += 1
@@ -27,41 +30,50 @@ def print_message():
 def get_streaming_callback(text_placeholder, tool_placeholder):
     accumulated_text = []
     accumulated_tool = []
+    usage = {}
 
-    def callback_func(message: dict):
-        nonlocal accumulated_text, accumulated_tool
-        message_content = message.get("content", None)
-
-        if isinstance(message_content, AIMessageChunk):
-            content = message_content.content
-            if isinstance(content, list) and len(content) > 0:
-                if content[0]["type"] == "text":
-                    accumulated_text.append(content[0]["text"])
-                    text_placeholder.markdown("".join(accumulated_text))
-            elif isinstance(content, str):
-                accumulated_text.append(content)
-                text_placeholder.markdown("".join(accumulated_text))
-        elif isinstance(message_content, ToolMessage):
-            accumulated_tool.append("\n```json\n" + str(message_content.content) + "\n```\n")
+    def callback_func(frames: list):
+        text_changed = tool_changed = False
+        for message_content in frames:
+            if isinstance(message_content, AIMessageChunk):
+                add_usage(usage, message_content)
+                content = chunk_text(message_content)
+                if content:
+                    accumulated_text.append(content)
+                    text_changed = True
+            elif isinstance(message_content, ToolMessage):
+                accumulated_tool.append("\n```json\n" + str(message_content.content) + "\n```\n")
+                tool_changed = True
+        if text_changed:
+            text_placeholder.markdown("".join(accumulated_text))
+        if tool_changed:
             with tool_placeholder.expander("🔧 Tool Call Information", expanded=True):
                 st.markdown("".join(accumulated_tool))
         return None
 
-    return callback_func, accumulated_text, accumulated_tool
+    return callback_func, accumulated_text, accumulated_tool, usage
 
-async def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
+def process_query(query, text_placeholder, tool_placeholder, timeout_seconds=60):
     try:
         if st.session_state.agent:
-            callback, acc_text, acc_tool = get_streaming_callback(text_placeholder, tool_placeholder)
-            response = await astream_graph(
+            callback, acc_text, acc_tool, usage = get_streaming_callback(text_placeholder, tool_placeholder)
+            config = RunnableConfig(
+                recursion_limit=st.session_state.recursion_limit,
+                configurable={"thread_id": st.session_state.thread_id},
+            )
+            messages = [HumanMessage(content=query)]
+            # Após reiniciar o processo o checkpoint em memória se perde: reidrata o
+            # agente com a janela do histórico persistido.
+            if not run_sync(st.session_state.agent.aget_state(config)).values:
+                messages = st.session_state.history.to_langchain_messages() + messages
+            response = stream_graph_in_background(
                 st.session_state.agent,
-                {"messages": [HumanMessage(content=query)]},
-                callback=callback,
-                config=RunnableConfig(
-                    recursion_limit=st.session_state.recursion_limit,
-                    thread_id=st.session_state.thread_id,
-                ),
+                {"messages": messages},
+                render=callback,
+                config=config,
+                timeout=timeout_seconds,
             )
+            st.session_state.last_usage = usage
             return response, "".join(acc_text), "".join(acc_tool)
         else:
             return {"error": "🚫 Agent not initialized."}, "", ""
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, ClassVar, List, Optional
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from core.constants import LLM_HEDGE_AFTER, LLM_HEDGE_DEFAULT_AFTER, LLM_HEDGE_MIN_SAMPLES
+from core.metrics import metrics
+from core.prompt_cache import bind_tools_for_caching, is_anthropic_model
+
+# Hedging de chamadas ao modelo para cortar a cauda de latência.
+#
+# O pedido vai ao modelo principal; se o primeiro chunk não chegar dentro do limiar
+# (fixo ou p95 observado), ou se o principal falhar antes de responder, o mesmo pedido
+# vai ao modelo reserva. Segue o stream de quem entregar o primeiro chunk, e o outro é
+# cancelado. Os modelos internos rodam sem callbacks, então a UI só vê os tokens do
+# vencedor, emitidos por este modelo.
+
+_TTFT_WINDOW = 200
+
+
+async def _next_chunk(stream):
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def _strip_cache_control(messages):
+    """Remove marcações de cache do Claude quando a chamada vai a outro provedor."""
+    cleaned = []
+    for message in messages:
+        if isinstance(message.content, list):
+            content = [
+                {k: v for k, v in block.items() if k != "cache_control"} if isinstance(block, dict) else block
+                for block in message.content
+            ]
+            message = message.model_copy(update={"content": content})
+        cleaned.append(message)
+    return cleaned
+
+
+class HedgedChatModel(BaseChatModel):
+    """Modelo principal com um reserva disparado quando o primeiro token demora."""
+
+    primary: Any
+    backup: Any
+    primary_name: str
+    backup_name: str
+    hedge_after: float = LLM_HEDGE_AFTER
+    binds_tools_per_model: ClassVar[bool] = True
+    _ttfts: deque = PrivateAttr(default_factory=lambda: deque(maxlen=_TTFT_WINDOW))
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        if kwargs:
+            primary, backup = self.primary.bind_tools(tools, **kwargs), self.backup.bind_tools(tools, **kwargs)
+        else:
+            primary = bind_tools_for_caching(self.primary, tools, self.primary_name)
+            backup = bind_tools_for_caching(self.backup, tools, self.backup_name)
+        return self.model_copy(update={"primary": primary, "backup": backup})
+
+    def hedge_delay(self):
+        """Limiar para disparar o reserva: o configurado ou o p95 do tempo até o primeiro chunk."""
+        if self.hedge_after > 0:
+            return self.hedge_after
+        if len(self._ttfts) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_AFTER
+        ordered = sorted(self._ttfts)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _stream_for(self, label, messages, stop, kwargs):
+        model, name = (self.primary, self.primary_name) if label == "primary" else (self.backup, self.backup_name)
+        if not is_anthropic_model(name):
+            messages = _strip_cache_control(messages)
+        return model.astream(messages, config={"callbacks": []}, stop=stop, **kwargs)
+
+    async def _race(self, messages, stop, kwargs):
+        """Devolve (rótulo do vencedor, stream do vencedor, primeiro chunk)."""
+        start = time.perf_counter()
+        streams, tasks, errors = {}, {}, {}
+
+        def launch(label):
+            streams[label] = self._stream_for(label, messages, stop, kwargs)
+            tasks[asyncio.create_task(_next_chunk(streams[label]))] = label
+
+        metrics.incr("hedge.requests")
+        launch("primary")
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            while True:
+                for task in done:
+                    label = tasks.pop(task)
+                    if task.exception() is not None:
+                        errors[label] = task.exception()
+                    elif winner is None:
+                        winner = (label, task.result())
+                if winner is not None:
+                    break
+                if "backup" not in streams:
+                    metrics.incr("hedge.failovers" if errors else "hedge.fired")
+                    launch("backup")
+                if not tasks:
+                    raise errors.get("primary") or errors["backup"]
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for label, stream in streams.items():
+                if winner is None or label != winner[0]:
+                    try:
+                        await stream.aclose()
+                    except Exception:
+                        pass
+
+        label, first = winner
+        elapsed = time.perf_counter() - start
+        metrics.incr(f"hedge.{label}_wins")
+        # Quando o reserva vence, o tempo decorrido é um limite inferior do TTFT do principal.
+        if label == "primary" or "primary" not in errors:
+            self._ttfts.append(elapsed)
+        return label, streams[label], first
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        _, stream, message = await self._race(messages, stop, kwargs)
+        try:
+            while message is not None:
+                chunk = ChatGenerationChunk(message=message)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                message = await _next_chunk(stream)
+        finally:
+            await stream.aclose()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        generation = None
+        async for chunk in self._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            generation = chunk if generation is None else generation + chunk
+        if generation is None:
+            raise ValueError("Hedged model returned an empty stream.")
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(generation.message))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        # O caminho síncrono não faz hedging; o agente sempre roda de forma assíncrona.
+        message = self.primary.invoke(messages, config={"callbacks": []}, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
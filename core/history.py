@@ -0,0 +1,97 @@
+import json
+import os
+import re
+import time
+from collections import deque
+from langchain_core.messages import AIMessage, HumanMessage
+from core.constants import HISTORY_DIR, HISTORY_WINDOW
+
+_THREAD_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def is_valid_thread_id(thread_id):
+    return bool(thread_id) and bool(_THREAD_ID_PATTERN.match(thread_id))
+
+
+class HistoryMessage:
+    __slots__ = ("role", "content", "ts")
+
+    def __init__(self, role, content, ts=None):
+        self.role = role
+        self.content = content
+        self.ts = ts if ts is not None else time.time()
+
+    def to_json(self):
+        return json.dumps({"role": self.role, "content": self.content, "ts": self.ts}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data["role"], data["content"], data.get("ts"))
+
+
+def _read_tail_lines(path, count, block_size=8192):
+    """Lê as últimas `count` linhas do arquivo a partir do fim, sem carregar o arquivo inteiro."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    lines = [line for line in data.split(b"\n") if line.strip()]
+    return [line.decode("utf-8") for line in lines[-count:]]
+
+
+class HistoryStore:
+    """
+    Histórico de uma conversa em log JSONL append-only (um arquivo por thread_id).
+
+    Só a janela visível fica em memória; ao reabrir uma thread (por exemplo após
+    reiniciar o servidor) apenas as últimas `window` mensagens são lidas do disco.
+    """
+
+    def __init__(self, thread_id, directory=HISTORY_DIR, window=HISTORY_WINDOW):
+        if not is_valid_thread_id(thread_id):
+            raise ValueError(f"Invalid thread_id: {thread_id!r}")
+        self.thread_id = thread_id
+        self.path = os.path.join(directory, f"{thread_id}.jsonl")
+        self._window = deque(maxlen=window)
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            for line in _read_tail_lines(self.path, window):
+                self._window.append(HistoryMessage.from_json(line))
+
+    def __len__(self):
+        return len(self._window)
+
+    def __iter__(self):
+        return iter(self._window)
+
+    def append(self, role, content):
+        message = HistoryMessage(role, content)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(message.to_json() + "\n")
+        self._window.append(message)
+        return message
+
+    def iter_all(self):
+        """Percorre a conversa completa em streaming, linha a linha, direto do log."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield HistoryMessage.from_json(line)
+
+    def to_langchain_messages(self):
+        """Converte a janela visível em mensagens do LangChain para reidratar a memória do agente."""
+        messages = []
+        for message in self._window:
+            if message.role == "user":
+                messages.append(HumanMessage(content=message.content))
+            elif message.role == "assistant":
+                messages.append(AIMessage(content=message.content))
+        return messages
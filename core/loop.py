@@ -0,0 +1,33 @@
+import asyncio
+import threading
+
+# Loop asyncio único do processo, rodando numa thread própria. As sessões do
+# Streamlit submetem corrotinas a ele em vez de aninhar loops com nest_asyncio,
+# então clientes MCP e streams continuam ativos entre os reruns do script.
+_loop = None
+_lock = threading.Lock()
+
+
+def get_event_loop():
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="mcp-event-loop", daemon=True)
+            thread.start()
+    return _loop
+
+
+def submit(coro):
+    """Agenda a corrotina no loop de fundo e devolve um concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def run_sync(coro, timeout=None):
+    """Executa a corrotina no loop de fundo e bloqueia a thread atual até o resultado."""
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
@@ -0,0 +1,108 @@
+import json
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from core.constants import LOOP_GUARD_MAX_REPEATS
+from core.metrics import metrics
+
+# Guarda contra laços do ReAct, como post_model_hook do agente.
+#
+# Cada chamada de ferramenta do turno é identificada por nome + argumentos canônicos.
+# Se o modelo repete uma chamada já feita, o hook responde com o resultado anterior e
+# um aviso, sem executar a ferramenta de novo. Um passo sem nada novo (só repetições,
+# ou só resultados idênticos a anteriores) conta como iteração desperdiçada; passando
+# de `max_repeats`, a última resposta do modelo é trocada pela resposta parcial e o
+# turno termina.
+
+_NUDGE = (
+    "[Repeated call: `{name}` was already called with these arguments in this turn. "
+    "The previous result is repeated below. Do not call it again; use this result or answer the user.]\n\n"
+)
+_STOPPED = "I stopped because I was repeating the same tool calls without making progress."
+_RESULT_CHARS = 1500
+
+
+def _fingerprint(tool_call):
+    return tool_call["name"], json.dumps(tool_call.get("args", {}), sort_keys=True, default=str)
+
+
+def _text(content):
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+
+
+def _current_turn(messages):
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    return messages[last_human + 1:]
+
+
+def _wasted_steps(turn):
+    """Passos anteriores do turno que não trouxeram nada novo."""
+    wasted, seen_results = 0, set()
+    results = {m.tool_call_id: m for m in turn if isinstance(m, ToolMessage)}
+    for message in turn:
+        if not isinstance(message, AIMessage) or not message.tool_calls:
+            continue
+        outputs = [results.get(tc["id"]) for tc in message.tool_calls]
+        if all(
+            o is not None and (o.additional_kwargs.get("loop_guard") or _text(o.content) in seen_results)
+            for o in outputs
+        ):
+            wasted += 1
+        seen_results.update(_text(o.content) for o in outputs if o is not None)
+    return wasted
+
+
+def _partial_answer(turn, last):
+    """Último texto do modelo no turno e o último resultado útil de ferramenta."""
+    texts = [m.content.strip() for m in turn + [last] if isinstance(m, AIMessage) and isinstance(m.content, str)]
+    parts = [t for t in texts if t][-1:]
+    parts.append(f"_{_STOPPED}_")
+    tool_results = [m for m in turn if isinstance(m, ToolMessage) and m.status != "error"]
+    if tool_results:
+        parts.append(f"The last result I got was:\n\n{_text(tool_results[-1].content)[:_RESULT_CHARS]}")
+    return "\n\n".join(parts)
+
+
+def make_loop_guard_hook(max_repeats=LOOP_GUARD_MAX_REPEATS):
+    def post_model_hook(state, config):
+        messages = state["messages"]
+        last = messages[-1]
+        if max_repeats <= 0 or not isinstance(last, AIMessage) or not last.tool_calls:
+            return {}
+
+        turn = _current_turn(messages[:-1])
+        results = {m.tool_call_id: m for m in turn if isinstance(m, ToolMessage)}
+        previous = {}
+        for message in turn:
+            for tool_call in getattr(message, "tool_calls", None) or []:
+                if tool_call["id"] in results:
+                    previous[_fingerprint(tool_call)] = results[tool_call["id"]]
+
+        repeated = [tc for tc in last.tool_calls if _fingerprint(tc) in previous]
+        if not repeated:
+            return {}
+        metrics.incr("loop_guard.repeated_calls", len(repeated))
+        wasted = _wasted_steps(turn) + (len(repeated) == len(last.tool_calls))
+        if len(repeated) == len(last.tool_calls):
+            metrics.incr("loop_guard.wasted_iterations")
+
+        if wasted >= max_repeats:
+            metrics.incr("loop_guard.stopped_turns")
+            # Id novo: o stream "messages" descarta ids já emitidos, e a última resposta
+            # do modelo já foi transmitida. Ela sai do estado e a parcial entra no lugar.
+            stopped = AIMessage(name=last.name, content=_partial_answer(turn, last))
+            return {"messages": [RemoveMessage(id=last.id), stopped]}
+
+        replies = []
+        for tool_call in repeated:
+            prior = previous[_fingerprint(tool_call)]
+            replies.append(
+                ToolMessage(
+                    content=_NUDGE.format(name=tool_call["name"]) + _text(prior.content),
+                    name=tool_call["name"],
+                    tool_call_id=tool_call["id"],
+                    status=prior.status,
+                    additional_kwargs={"loop_guard": "repeat"},
+                )
+            )
+        return {"messages": replies}
+
+    return post_model_hook
@@ -0,0 +1,25 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """Contadores simples e thread-safe, compartilhados pelo processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self, prefix=""):
+        with self._lock:
+            return {k: v for k, v in self._counters.items() if k.startswith(prefix)}
+
+
+metrics = Metrics()
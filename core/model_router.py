@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import time
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from core.constants import (
+    MODEL_ROUTER_FAST,
+    MODEL_ROUTER_FAST_MAX_STEPS,
+    MODEL_ROUTER_MAX_QUERY_CHARS,
+    MODEL_ROUTER_STRONG,
+)
+from core.metrics import metrics
+from core.prompt_cache import bind_tools_for_caching
+
+# Roteamento entre um modelo rápido/barato e um forte, decidido por turno.
+#
+# A primeira chamada do turno é classificada por heurística sobre a pergunta.
+# Depois disso o turno só sobe de nível: quando o modelo rápido lança erro, devolve
+# resposta vazia, recebe erro de ferramenta, repete uma chamada de ferramenta ou
+# passa de MODEL_ROUTER_FAST_MAX_STEPS passos. O nível usado fica registrado em
+# `response_metadata["model_tier"]` de cada AIMessage.
+
+FAST, STRONG = "fast", "strong"
+TIER_KEY = "model_tier"
+
+_STRONG_HINTS = re.compile(
+    r"\b(analy[sz]e|analysis|compare|comparison|explain|why|plan|design|write|code|debug|refactor|"
+    r"summari[sz]e|research|evaluate|strategy|report|step by step|pros and cons)\b",
+    re.IGNORECASE,
+)
+
+
+def _has_api_key(model_name):
+    if model_name.startswith("fake"):
+        return True
+    key = "ANTHROPIC_API_KEY" if model_name.startswith("claude") else "OPENAI_API_KEY"
+    return bool(os.getenv(key))
+
+
+def resolve_tiers():
+    """(rápido, forte): o primeiro modelo de cada nível com chave de API configurada, ou None."""
+    fast = next((name for name in MODEL_ROUTER_FAST if _has_api_key(name)), None)
+    strong = next((name for name in MODEL_ROUTER_STRONG if _has_api_key(name)), None)
+    return fast, strong
+
+
+def classify_query(text):
+    if len(text) > MODEL_ROUTER_MAX_QUERY_CHARS:
+        return STRONG
+    if _STRONG_HINTS.search(text) or text.count("?") > 1 or "\n" in text.strip():
+        return STRONG
+    return FAST
+
+
+def _message_text(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def _is_empty(response):
+    return not response.tool_calls and not _message_text(response).strip()
+
+
+def _escalation_reason(turn):
+    if any(isinstance(m, ToolMessage) and m.status == "error" for m in turn):
+        return "tool_error"
+    seen = set()
+    for message in turn:
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            fingerprint = (tool_call["name"], json.dumps(tool_call.get("args", {}), sort_keys=True, default=str))
+            if fingerprint in seen:
+                return "loop"
+            seen.add(fingerprint)
+    if sum(isinstance(m, AIMessage) for m in turn) >= MODEL_ROUTER_FAST_MAX_STEPS:
+        return "steps"
+    return None
+
+
+def choose_tier(messages):
+    """Devolve (nível, motivo da escalada ou None) para a próxima chamada do turno atual."""
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+    turn = messages[last_human + 1:]
+    tiers = [m.response_metadata.get(TIER_KEY) for m in turn if isinstance(m, AIMessage)]
+    if STRONG in tiers:
+        return STRONG, None
+    if not tiers:
+        query = _message_text(messages[last_human]) if last_human >= 0 else ""
+        tier = classify_query(query)
+        metrics.incr(f"model_router.classified.{tier}")
+        return tier, None
+    reason = _escalation_reason(turn)
+    return (STRONG, reason) if reason else (FAST, None)
+
+
+class ModelRouter(Runnable):
+    """Modelo composto por dois níveis; substitui um chat model em create_react_agent."""
+
+    def __init__(self, fast, strong, fast_name, strong_name):
+        self.fast = fast
+        self.strong = strong
+        self.fast_name = fast_name
+        self.strong_name = strong_name
+
+    def bind_tools(self, tools, **kwargs):
+        if kwargs:
+            fast, strong = self.fast.bind_tools(tools, **kwargs), self.strong.bind_tools(tools, **kwargs)
+        else:
+            fast = bind_tools_for_caching(self.fast, tools, self.fast_name)
+            strong = bind_tools_for_caching(self.strong, tools, self.strong_name)
+        return ModelRouter(fast, strong, self.fast_name, self.strong_name)
+
+    def _record(self, tier, response, elapsed):
+        metrics.incr(f"model_router.{tier}.calls")
+        metrics.incr(f"model_router.{tier}.latency_s", elapsed)
+        usage = response.usage_metadata or {}
+        metrics.incr(f"model_router.{tier}.input_tokens", usage.get("input_tokens", 0))
+        metrics.incr(f"model_router.{tier}.output_tokens", usage.get("output_tokens", 0))
+        response.response_metadata[TIER_KEY] = tier
+        return response
+
+    def _escalate(self, reason):
+        metrics.incr("model_router.escalations")
+        metrics.incr(f"model_router.escalations.{reason}")
+
+    def invoke(self, input, config=None, **kwargs):
+        messages = input.to_messages() if isinstance(input, PromptValue) else list(input)
+        tier, reason = choose_tier(messages)
+        if reason:
+            self._escalate(reason)
+        if tier == FAST:
+            start = time.perf_counter()
+            try:
+                response = self.fast.invoke(messages, config, **kwargs)
+                if not _is_empty(response):
+                    return self._record(FAST, response, time.perf_counter() - start)
+                self._escalate("empty")
+            except Exception as e:
+                print(f"[WARN] Modelo rápido falhou, usando o forte: {e}")
+                self._escalate("error")
+        start = time.perf_counter()
+        response = self.strong.invoke(messages, config, **kwargs)
+        return self._record(STRONG, response, time.perf_counter() - start)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        messages = input.to_messages() if isinstance(input, PromptValue) else list(input)
+        tier, reason = choose_tier(messages)
+        if reason:
+            self._escalate(reason)
+        if tier == FAST:
+            start = time.perf_counter()
+            try:
+                response = await self.fast.ainvoke(messages, config, **kwargs)
+                if not _is_empty(response):
+                    return self._record(FAST, response, time.perf_counter() - start)
+                self._escalate("empty")
+            except Exception as e:
+                print(f"[WARN] Modelo rápido falhou, usando o forte: {e}")
+                self._escalate("error")
+        start = time.perf_counter()
+        response = await self.strong.ainvoke(messages, config, **kwargs)
+        return self._record(STRONG, response, time.perf_counter() - start)
+
+
+def tier_stats():
+    """Chamadas, latência média e tokens médios por nível, para calibrar os limiares."""
+    stats = metrics.snapshot("model_router.")
+    result = {}
+    for tier in (FAST, STRONG):
+        calls = stats.get(f"model_router.{tier}.calls", 0)
+        if calls:
+            result[tier] = {
+                "calls": int(calls),
+                "avg_latency_s": stats.get(f"model_router.{tier}.latency_s", 0) / calls,
+                "avg_input_tokens": stats.get(f"model_router.{tier}.input_tokens", 0) / calls,
+                "avg_output_tokens": stats.get(f"model_router.{tier}.output_tokens", 0) / calls,
+            }
+    result["escalations"] = int(stats.get("model_router.escalations", 0))
+    return result
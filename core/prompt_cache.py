@@ -0,0 +1,48 @@
+from langchain_core.messages import SystemMessage
+from core.constants import SYSTEM_PROMPT
+
+# Prefixo estável para cache de prompt no provedor: ferramentas em ordem fixa,
+# depois o system prompt. No Claude o fim de cada bloco recebe um breakpoint
+# `cache_control`; na OpenAI o cache de prefixo é automático e só depende de o
+# início do prompt ser idêntico entre chamadas.
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def is_anthropic_model(model_name):
+    return bool(model_name) and model_name.startswith("claude")
+
+
+def sort_tools(tools):
+    return sorted(tools, key=lambda tool: tool.name)
+
+
+def build_system_prompt(model_name):
+    if is_anthropic_model(model_name):
+        return SystemMessage(content=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": _EPHEMERAL}])
+    return SYSTEM_PROMPT
+
+
+def bind_tools_for_caching(model, tools, model_name):
+    """Faz o bind das ferramentas em ordem estável, marcando a última para cache no Claude."""
+    tools = sort_tools(tools)
+    # Modelos compostos (hedging) fazem o bind em cada modelo interno com o formato dele.
+    if not tools or not is_anthropic_model(model_name) or getattr(model, "binds_tools_per_model", False):
+        return model.bind_tools(tools)
+    from langchain_anthropic.chat_models import convert_to_anthropic_tool
+
+    formatted = [dict(convert_to_anthropic_tool(tool)) for tool in tools]
+    formatted[-1]["cache_control"] = _EPHEMERAL
+    return model.bind_tools(formatted)
+
+
+def add_usage(totals, message):
+    """Acumula o uso de tokens (incluindo leitura/escrita de cache) de um chunk de resposta."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    details = usage.get("input_token_details") or {}
+    totals["input_tokens"] = totals.get("input_tokens", 0) + usage.get("input_tokens", 0)
+    totals["output_tokens"] = totals.get("output_tokens", 0) + usage.get("output_tokens", 0)
+    totals["cache_read"] = totals.get("cache_read", 0) + (details.get("cache_read") or 0)
+    totals["cache_creation"] = totals.get("cache_creation", 0) + (details.get("cache_creation") or 0)
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import json
+import threading
+from core.agent import McpConnection, create_agent, create_model
+from core.metrics import metrics
+
+# Caches do processo para a UI: clientes de modelo (e seus pools HTTP), conexões
+# MCP e grafos compilados. Tudo aqui roda no loop de fundo de core/loop.py, então
+# os objetos podem ser compartilhados entre sessões com segurança.
+
+_lock = threading.Lock()
+_models = {}
+_agents = {}
+_connections = {}  # fingerprint da config -> [McpConnection, refcount]
+_pool_lock = asyncio.Lock()
+
+
+def _fingerprint(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def tools_fingerprint(tools):
+    schemas = []
+    for tool in sorted(tools, key=lambda t: t.name):
+        args_schema = tool.args_schema
+        if args_schema is not None and not isinstance(args_schema, dict):
+            args_schema = args_schema.model_json_schema()
+        schemas.append([tool.name, tool.description, args_schema])
+    return _fingerprint(schemas)
+
+
+def get_model(selected_model):
+    """Cliente de modelo compartilhado, reaproveitando conexões keep-alive com a API."""
+    with _lock:
+        model = _models.get(selected_model)
+        if model is None:
+            model = _models[selected_model] = create_model(selected_model)
+        return model
+
+
+async def acquire_connection(mcp_config):
+    """Devolve a conexão MCP ativa para esta config (ou abre uma) e incrementa o refcount."""
+    key = _fingerprint(mcp_config)
+    async with _pool_lock:
+        entry = _connections.get(key)
+        if entry is not None:
+            entry[1] += 1
+            metrics.incr("registry.connection_hits")
+            return entry[0]
+        connection = McpConnection(mcp_config)
+        await connection.start()
+        _connections[key] = [connection, 1]
+        return connection
+
+
+async def release_connection(connection):
+    async with _pool_lock:
+        for key, entry in list(_connections.items()):
+            if entry[0] is connection:
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                del _connections[key]
+                with _lock:
+                    for agent_key in [k for k in _agents if k[1] == key]:
+                        del _agents[agent_key]
+                break
+    await connection.close()
+
+
+def is_connection_pooled(mcp_config):
+    return _fingerprint(mcp_config) in _connections
+
+
+def get_agent(selected_model, connection):
+    """
+    Grafo compilado compartilhado por (modelo, conexão, schemas das ferramentas).
+    Cada sessão só fornece o próprio thread_id na config da execução.
+    """
+    connection_key = next((k for k, entry in _connections.items() if entry[0] is connection), None)
+    key = (selected_model, connection_key, tools_fingerprint(connection.tools))
+    with _lock:
+        agent = _agents.get(key) if connection_key else None
+        if agent is not None:
+            metrics.incr("registry.agent_hits")
+            return agent
+    agent = create_agent(get_model(selected_model), connection.tools, model_name=selected_model)
+    metrics.incr("registry.agent_compiles")
+    if connection_key:
+        with _lock:
+            agent = _agents.setdefault(key, agent)
+    return agent
@@ -0,0 +1,234 @@
+import asyncio
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from core.constants import (
+    RESPONSE_CACHE_DB,
+    RESPONSE_CACHE_EMBEDDING_MODEL,
+    RESPONSE_CACHE_REPLAY_DELAY,
+    RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+    RESPONSE_CACHE_TTL,
+)
+from core.fake_llm import FakeStreamingChatModel
+from core.metrics import metrics
+from core.prompt_cache import bind_tools_for_caching
+
+# Cache de respostas do modelo, em SQLite.
+#
+# Chave exata: modelo + hash do system prompt + hash dos schemas das ferramentas +
+# histórico normalizado. Só respostas sem chamadas de ferramenta são guardadas, então
+# perguntas que dependem de ferramentas (horário, buscas) continuam indo ao modelo.
+# Na primeira pergunta da conversa há também uma busca semântica no mesmo escopo
+# (modelo + system + ferramentas). O acerto é reproduzido como stream por um modelo
+# falso, passando pelos mesmos callbacks da UI.
+
+_VECTOR_DIM = 512
+_SEMANTIC_CANDIDATES = 500
+
+
+def _message_text(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def _hash(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def tools_hash(tools):
+    return _hash([convert_to_openai_tool(tool) for tool in tools])
+
+
+def _history(messages):
+    """Histórico sem o system prompt, sem ids e com espaços normalizados."""
+    items = []
+    for message in messages:
+        if message.type == "system":
+            continue
+        text = _normalize(_message_text(message))
+        item = [message.type, text.casefold() if message.type == "human" else text]
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            item.append([tool_call["name"], tool_call.get("args", {})])
+        if message.type == "tool":
+            item.append(message.name)
+        items.append(item)
+    return items
+
+
+def _local_vector(text):
+    """Vetor de hashing (unigramas + bigramas), estável entre processos."""
+    tokens = re.findall(r"\w+", text.casefold())
+    vector = [0.0] * _VECTOR_DIM
+    for term in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        h = zlib.crc32(term.encode("utf-8"))
+        vector[h % _VECTOR_DIM] += 1.0 if h & 0x80000000 else -1.0
+    return vector
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCacheStore:
+    def __init__(self, path=RESPONSE_CACHE_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, scope TEXT, vector TEXT, content TEXT,
+                latency_s REAL, created_at REAL)"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope, created_at)")
+
+    def get(self, key, ttl=RESPONSE_CACHE_TTL):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, latency_s FROM responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - ttl),
+            ).fetchone()
+        return row
+
+    def find_similar(self, scope, vector, threshold, ttl=RESPONSE_CACHE_TTL):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vector, content, latency_s FROM responses "
+                "WHERE scope = ? AND vector IS NOT NULL AND created_at > ? ORDER BY created_at DESC LIMIT ?",
+                (scope, time.time() - ttl, _SEMANTIC_CANDIDATES),
+            ).fetchall()
+        best, best_score = None, threshold
+        for stored, content, latency_s in rows:
+            score = _cosine(vector, json.loads(stored))
+            if score >= best_score:
+                best, best_score = (content, latency_s), score
+        return best
+
+    def put(self, key, scope, vector, content, latency_s):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, json.dumps(vector) if vector else None, content, latency_s, time.time()),
+            )
+            self._conn.commit()
+
+    def expire(self, ttl=RESPONSE_CACHE_TTL):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE created_at <= ?", (time.time() - ttl,))
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+_embeddings = None
+
+
+def get_response_cache_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResponseCacheStore()
+            _store.expire()
+    return _store
+
+
+async def _embed(text):
+    global _embeddings
+    if not RESPONSE_CACHE_EMBEDDING_MODEL:
+        return _local_vector(text)
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        _embeddings = OpenAIEmbeddings(model=RESPONSE_CACHE_EMBEDDING_MODEL)
+    return await _embeddings.aembed_query(text)
+
+
+class ResponseCache(Runnable):
+    """Envolve o modelo do agente com o cache de respostas; substitui o modelo em create_react_agent."""
+
+    binds_tools_per_model = True
+
+    def __init__(self, model, model_name, tools_key="", store=None):
+        self.model = model
+        self.model_name = model_name
+        self.tools_key = tools_key
+        self.store = store or get_response_cache_store()
+
+    def bind_tools(self, tools, **kwargs):
+        if kwargs:
+            bound = self.model.bind_tools(tools, **kwargs)
+        else:
+            bound = bind_tools_for_caching(self.model, tools, self.model_name)
+        return ResponseCache(bound, self.model_name, tools_hash(tools), self.store)
+
+    def _keys(self, messages):
+        system = [_message_text(m) for m in messages if m.type == "system"]
+        scope = _hash([self.model_name, _hash(system), self.tools_key])
+        history = _history(messages)
+        first_turn = len(history) == 1 and history[0][0] == "human"
+        return scope, _hash([scope, history]), history[0][1] if first_turn else None
+
+    async def _lookup(self, messages):
+        scope, key, first_query = self._keys(messages)
+        row = await asyncio.to_thread(self.store.get, key)
+        if row is not None:
+            return "exact", row, scope, key, None
+        vector = None
+        if first_query and RESPONSE_CACHE_SEMANTIC_THRESHOLD > 0:
+            vector = await _embed(first_query)
+            row = await asyncio.to_thread(self.store.find_similar, scope, vector, RESPONSE_CACHE_SEMANTIC_THRESHOLD)
+            if row is not None:
+                return "semantic", row, scope, key, vector
+        return None, None, scope, key, vector
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        messages = input.to_messages() if isinstance(input, PromptValue) else list(input)
+        kind, row, scope, key, vector = await self._lookup(messages)
+        if kind is not None:
+            content, latency_s = row
+            start = time.perf_counter()
+            replay = FakeStreamingChatModel(responses=[content], token_delay=RESPONSE_CACHE_REPLAY_DELAY)
+            response = await replay.ainvoke(messages, config)
+            metrics.incr(f"response_cache.hits.{kind}")
+            metrics.incr("response_cache.latency_saved_s", max(0.0, latency_s - (time.perf_counter() - start)))
+            response.response_metadata["response_cache"] = kind
+            return response
+
+        metrics.incr("response_cache.misses")
+        start = time.perf_counter()
+        response = await self.model.ainvoke(messages, config, **kwargs)
+        elapsed = time.perf_counter() - start
+        text = _message_text(response)
+        if not response.tool_calls and text.strip():
+            await asyncio.to_thread(self.store.put, key, scope, vector, text, elapsed)
+        return response
+
+    def invoke(self, input, config=None, **kwargs):
+        # Sem cache no caminho síncrono; o agente sempre roda de forma assíncrona.
+        return self.model.invoke(input, config, **kwargs)
+
+
+def response_cache_stats():
+    stats = metrics.snapshot("response_cache.")
+    hits = stats.get("response_cache.hits.exact", 0) + stats.get("response_cache.hits.semantic", 0)
+    return {
+        "hits": int(hits),
+        "semantic_hits": int(stats.get("response_cache.hits.semantic", 0)),
+        "lookups": int(hits + stats.get("response_cache.misses", 0)),
+        "latency_saved_s": stats.get("response_cache.latency_saved_s", 0.0),
+    }
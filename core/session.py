@@ -1,57 +1,29 @@
-import asyncio
 import streamlit as st
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.runnables import RunnableConfig
-from core.constants import OUTPUT_TOKEN_INFO, SYSTEM_PROMPT
 from core.config import load_config_from_json
+from core.loop import run_sync
+from core.registry import acquire_connection, get_agent, release_connection
 
 import uuid
 def random_uuid():
     return str(uuid.uuid4())
 
-async def cleanup_mcp_client():
+def cleanup_mcp_client():
     if "mcp_client" in st.session_state and st.session_state.mcp_client is not None:
         try:
-            await st.session_state.mcp_client.__aexit__(None, None, None)
+            run_sync(release_connection(st.session_state.mcp_client))
             st.session_state.mcp_client = None
         except Exception:
             pass
 
-async def initialize_session(mcp_config=None):
+def initialize_session(mcp_config=None):
     with st.spinner("🔄 Connecting to MCP server..."):
-        await cleanup_mcp_client()
+        cleanup_mcp_client()
         if mcp_config is None:
             mcp_config = load_config_from_json()
-        client = MultiServerMCPClient(mcp_config)
-        await client.__aenter__()
-        tools = client.get_tools()
-        st.session_state.tool_count = len(tools)
-        st.session_state.mcp_client = client
-
-        selected_model = st.session_state.selected_model
-        if selected_model.startswith("claude"):
-            model = ChatAnthropic(
-                model=selected_model,
-                temperature=0.1,
-                max_tokens=OUTPUT_TOKEN_INFO[selected_model]["max_tokens"],
-            )
-        else:
-            model = ChatOpenAI(
-                model=selected_model,
-                temperature=0.1,
-                max_tokens=OUTPUT_TOKEN_INFO[selected_model]["max_tokens"],
-            )
-
-        agent = create_react_agent(
-            model,
-            tools,
-            checkpointer=MemorySaver(),
-            prompt=SYSTEM_PROMPT,
-        )
+        connection = run_sync(acquire_connection(mcp_config))
+        agent = get_agent(st.session_state.selected_model, connection)
+        st.session_state.tool_count = len(connection.tools)
+        st.session_state.mcp_client = connection
         st.session_state.agent = agent
         st.session_state.session_initialized = True
         return True
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from collections import deque
+from langchain_core.messages.ai import AIMessageChunk
+from langchain_core.messages.tool import ToolMessage
+from core.constants import STREAM_QUEUE_SIZE, STREAM_OVERFLOW_POLICY, STREAM_RENDER_INTERVAL
+from core.loop import submit
+from utils import astream_graph
+
+STREAM_POLICIES = ("merge", "drop", "block")
+
+
+def chunk_text(message):
+    """Extrai o texto de um AIMessageChunk (conteúdo em str ou em blocos, estilo Anthropic)."""
+    content = getattr(message, "content", None)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            item.get("text", "") for item in content
+            if isinstance(item, dict) and item.get("type") == "text"
+        )
+    return ""
+
+
+class StreamBuffer:
+    """
+    Fila limitada entre o produtor (execução do grafo) e o consumidor (renderização).
+
+    Quando a fila está cheia, a política decide o que acontece com o novo frame:
+    "merge" funde deltas da mesma mensagem no último frame, "drop" descarta frames
+    intermediários sem texto e "block" faz o produtor esperar. ToolMessages nunca
+    são descartadas nem fundidas.
+    """
+
+    def __init__(self, maxsize=STREAM_QUEUE_SIZE, policy=STREAM_OVERFLOW_POLICY):
+        if policy not in STREAM_POLICIES:
+            raise ValueError(f"Invalid stream policy: {policy}. Must be one of {STREAM_POLICIES}.")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.merged = 0
+        self.dropped = 0
+        self._frames = deque()
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self._error = None
+
+    def _absorb(self, message):
+        if self.policy == "block" or not isinstance(message, AIMessageChunk):
+            return False
+        if self.policy == "drop" and not chunk_text(message) and not message.usage_metadata:
+            self.dropped += 1
+            return True
+        tail = self._frames[-1]
+        if isinstance(tail, AIMessageChunk) and tail.id == message.id:
+            self._frames[-1] = tail + message
+            self.merged += 1
+            return True
+        return False
+
+    async def put(self, message):
+        async with self._cond:
+            if self._closed:
+                return
+            if isinstance(message, ToolMessage) and self.policy != "block":
+                # Resultados de ferramentas passam por cima do limite: nunca são perdidos
+                # e nunca travam o produtor.
+                self._frames.append(message)
+            else:
+                while len(self._frames) >= self.maxsize:
+                    if self._absorb(message):
+                        self._cond.notify_all()
+                        return
+                    await self._cond.wait()
+                    if self._closed:
+                        return
+                self._frames.append(message)
+            self._cond.notify_all()
+
+    async def get_batch(self):
+        """Espera e devolve todos os frames pendentes; None quando o produtor terminou."""
+        async with self._cond:
+            while not self._frames and not self._closed:
+                await self._cond.wait()
+            if not self._frames:
+                if self._error is not None:
+                    raise self._error
+                return None
+            frames = list(self._frames)
+            self._frames.clear()
+            self._cond.notify_all()
+            return frames
+
+    async def close(self, error=None):
+        async with self._cond:
+            self._closed = True
+            self._error = error
+            self._cond.notify_all()
+
+
+async def produce_stream(buffer, graph, inputs, config=None):
+    """Executa o grafo e publica cada mensagem no buffer; fecha o buffer ao terminar."""
+    error = None
+    try:
+        return await astream_graph(
+            graph,
+            inputs,
+            config=config,
+            callback=lambda message: buffer.put(message["content"]),
+        )
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        await buffer.close(error)
+
+
+async def consume_stream(buffer, render, min_interval=STREAM_RENDER_INTERVAL):
+    """Renderiza lotes de frames; o intervalo mínimo deixa os deltas se acumularem entre renders."""
+    while True:
+        frames = await buffer.get_batch()
+        if frames is None:
+            return
+        render(frames)
+        if min_interval:
+            await asyncio.sleep(min_interval)
+
+
+async def astream_graph_buffered(graph, inputs, render, config=None, timeout=None):
+    """
+    Desacopla o streaming do grafo da renderização: o grafo roda numa task produtora
+    e o consumidor renderiza com coalescência, sem que um atrase o outro.
+    """
+    buffer = StreamBuffer()
+    producer = asyncio.create_task(produce_stream(buffer, graph, inputs, config))
+    try:
+        await asyncio.wait_for(consume_stream(buffer, render), timeout=timeout)
+    finally:
+        if not producer.done():
+            producer.cancel()
+    return await producer
+
+
+def stream_graph_in_background(graph, inputs, render, config=None, timeout=None):
+    """
+    Versão síncrona para o Streamlit: o grafo roda no loop de fundo do processo e a
+    thread do script apenas busca os lotes e renderiza, já que as chamadas st.* precisam
+    acontecer na thread da sessão.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    buffer = StreamBuffer()
+    producer = submit(produce_stream(buffer, graph, inputs, config))
+    try:
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"Streaming exceeded {timeout} seconds.")
+            pending = submit(buffer.get_batch())
+            try:
+                frames = pending.result(remaining)
+            except TimeoutError:
+                pending.cancel()
+                raise
+            if frames is None:
+                break
+            render(frames)
+            if STREAM_RENDER_INTERVAL:
+                time.sleep(STREAM_RENDER_INTERVAL)
+        return producer.result()
+    finally:
+        if not producer.done():
+            producer.cancel()
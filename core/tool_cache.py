@@ -0,0 +1,152 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from core.constants import TOOL_CACHE_DB, TOOL_CACHE_MAX_ENTRIES
+from core.metrics import metrics
+
+# Memoização de resultados de ferramentas MCP.
+#
+# A política fica em cada servidor do config.json, na chave "cache" (que não é
+# repassada ao MultiServerMCPClient). "*" vale para todas as ferramentas do servidor:
+#
+#   "serper": {"command": "uvx", "args": [...], "cache": {"*": 600, "scrape": "never"}}
+#
+# Valores: segundos de TTL, "forever" ou "never". Sem política, nada é cacheado.
+
+CACHE_KEY = "cache"
+
+
+def split_cache_policies(mcp_config):
+    """Separa a config de conexão das políticas de cache de cada servidor."""
+    connections, policies = {}, {}
+    for name, config in mcp_config.items():
+        config = dict(config)
+        policy = config.pop(CACHE_KEY, None)
+        connections[name] = config
+        if policy:
+            policies[name] = policy
+    return connections, policies
+
+
+def _resolve_ttl(policy, tool_name):
+    """Devolve o TTL em segundos (None = para sempre) ou False quando não deve cachear."""
+    value = policy.get(tool_name, policy.get("*", "never"))
+    if value == "never" or value == 0:
+        return False
+    if value == "forever":
+        return None
+    return float(value)
+
+
+def _cache_key(server, tool_name, arguments):
+    canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{server}\x00{tool_name}\x00{canonical}".encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """LRU em memória com camada opcional em disco (SQLite) para resultados de ferramentas."""
+
+    def __init__(self, max_entries=TOOL_CACHE_MAX_ENTRIES, path=TOOL_CACHE_DB):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tool_results (key TEXT PRIMARY KEY, expires_at REAL, value BLOB)"
+            )
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    metrics.incr("tool_cache.hits.memory")
+                    return True, value
+                del self._memory[key]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT expires_at, value FROM tool_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and (row[0] is None or row[0] > now):
+                    value = pickle.loads(row[1])
+                    self._remember(key, row[0], value)
+                    metrics.incr("tool_cache.hits.disk")
+                    return True, value
+        metrics.incr("tool_cache.misses")
+        return False, None
+
+    def set(self, key, value, ttl):
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tool_results VALUES (?, ?, ?)",
+                    (key, expires_at, pickle.dumps(value)),
+                )
+                self._conn.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache()
+    return _cache
+
+
+def _wrap_tool(tool, server, ttl, cache):
+    call_tool = tool.coroutine
+
+    async def cached_call(**arguments):
+        key = _cache_key(server, tool.name, arguments)
+        hit, value = cache.get(key)
+        if hit:
+            return value
+        value = await call_tool(**arguments)
+        cache.set(key, value, ttl)
+        return value
+
+    return tool.model_copy(update={"coroutine": cached_call})
+
+
+def wrap_tools(server_name_to_tools, policies, cache=None):
+    """Aplica a memoização às ferramentas dos servidores que têm política; as demais passam direto."""
+    cache = cache or get_tool_cache()
+    wrapped = []
+    for server, tools in server_name_to_tools.items():
+        policy = policies.get(server)
+        for tool in tools:
+            ttl = _resolve_ttl(policy, tool.name) if policy else False
+            if ttl is False or tool.coroutine is None:
+                wrapped.append(tool)
+            else:
+                wrapped.append(_wrap_tool(tool, server, ttl, cache))
+    return wrapped
+
+
+def cache_hit_rate():
+    stats = metrics.snapshot("tool_cache.")
+    hits = stats.get("tool_cache.hits.memory", 0) + stats.get("tool_cache.hits.disk", 0)
+    total = hits + stats.get("tool_cache.misses", 0)
+    return hits, total
@@ -0,0 +1,181 @@
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable
+from langchain_core.tools import StructuredTool
+from core.constants import TOOL_ROUTER_MIN_TOOLS, TOOL_ROUTER_PINNED, TOOL_ROUTER_TOP_K
+from core.metrics import metrics
+from core.prompt_cache import bind_tools_for_caching
+
+# Seleção de ferramentas por pergunta. Em vez de enviar os schemas de todas as
+# ferramentas em cada chamada, o modelo recebe as mais relevantes para a última
+# pergunta do usuário, as fixadas e `find_tools`, que busca no catálogo completo
+# e libera as encontradas no passo seguinte.
+#
+# O índice é lexical (TF-IDF sobre nome e descrição), calculado localmente: não
+# acrescenta uma chamada de rede antes do primeiro token.
+
+FIND_TOOLS_NAME = "find_tools"
+_EXPAND_K = 5
+_MAX_BINDINGS = 64
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "get", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "the", "this", "to", "use",
+    "what", "when", "where", "which", "who", "with", "you",
+}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _tokenize(text):
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _message_text(message):
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+class ToolIndex:
+    """Vetores TF-IDF (normalizados) de nome + descrição de cada ferramenta."""
+
+    def __init__(self, tools):
+        documents = {tool.name: _tokenize(f"{tool.name} {tool.name} {tool.description}") for tool in tools}
+        document_frequency = Counter(token for tokens in documents.values() for token in set(tokens))
+        total = len(documents)
+        self.idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        self.vectors = {name: self._vector(tokens) for name, tokens in documents.items()}
+        self.descriptions = {tool.name: tool.description for tool in tools}
+
+    def _vector(self, tokens):
+        weights = {token: count * self.idf.get(token, 0) for token, count in Counter(tokens).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {token: w / norm for token, w in weights.items() if w}
+
+    def search(self, query, k):
+        """Nomes das até `k` ferramentas com similaridade positiva, da mais para a menos relevante."""
+        query_vector = self._vector(_tokenize(query))
+        if not query_vector:
+            return []
+        scores = []
+        for name, vector in self.vectors.items():
+            score = sum(weight * vector.get(token, 0) for token, weight in query_vector.items())
+            if score > 0:
+                scores.append((score, name))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return [name for _, name in scores[:k]]
+
+
+def get_tool_index(tools):
+    """Índice compartilhado por conjunto de ferramentas (nome + descrição); calculado uma vez."""
+    key = tuple(sorted((tool.name, tool.description) for tool in tools))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ToolIndex(tools)
+        return index
+
+
+def should_route_tools(tools):
+    return TOOL_ROUTER_TOP_K > 0 and len(tools) > max(TOOL_ROUTER_MIN_TOOLS, TOOL_ROUTER_TOP_K)
+
+
+def make_find_tools_tool(index):
+    def find_tools(capability: str) -> str:
+        matches = index.search(capability, _EXPAND_K)
+        if not matches:
+            return json.dumps({"tools": [], "note": "No matching tools. Try other keywords."})
+        return json.dumps(
+            {"tools": [{"name": name, "description": index.descriptions[name]} for name in matches]},
+            ensure_ascii=False,
+        )
+
+    return StructuredTool.from_function(
+        find_tools,
+        name=FIND_TOOLS_NAME,
+        description=(
+            "Search the full tool catalog when none of the available tools fits the task. "
+            "Describe the capability you need; the matching tools become callable on your next step."
+        ),
+    )
+
+
+class ToolRouter(Runnable):
+    """
+    Modelo com ferramentas escolhidas a cada chamada. Usado no lugar do modelo
+    já com bind_tools em create_react_agent; o ToolNode continua com todas.
+    """
+
+    def __init__(self, model, tools, model_name=None, top_k=TOOL_ROUTER_TOP_K, pinned=TOOL_ROUTER_PINNED):
+        self.model = model
+        self.model_name = model_name
+        self.top_k = top_k
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.pinned = [name for name in pinned if name in self.tools_by_name]
+        self.index = get_tool_index(tools)
+        self.find_tools = make_find_tools_tool(self.index)
+        self._bindings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bind_tools(self, tools, **kwargs):
+        # create_react_agent chama bind_tools com a lista completa; a seleção é feita em cada chamada.
+        return self
+
+    def select_tools(self, messages):
+        """Nomes das ferramentas para esta chamada, a partir das mensagens de entrada do modelo."""
+        query = next((_message_text(m) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        selected = set(self.pinned)
+        selected.update(self.index.search(query, self.top_k))
+        for message in messages:
+            # Ferramentas já usadas na conversa continuam disponíveis.
+            if isinstance(message, AIMessage):
+                selected.update(tc["name"] for tc in message.tool_calls)
+            elif isinstance(message, ToolMessage) and message.name == FIND_TOOLS_NAME:
+                try:
+                    found = json.loads(message.content).get("tools", [])
+                except (TypeError, ValueError, AttributeError):
+                    continue
+                selected.update(item["name"] for item in found)
+        selected.intersection_update(self.tools_by_name)
+        return selected
+
+    def bound_model(self, names):
+        key = frozenset(names)
+        with self._lock:
+            bound = self._bindings.get(key)
+            if bound is not None:
+                self._bindings.move_to_end(key)
+                return bound
+        tools = [self.tools_by_name[name] for name in sorted(names)] + [self.find_tools]
+        bound = bind_tools_for_caching(self.model, tools, self.model_name)
+        with self._lock:
+            self._bindings[key] = bound
+            while len(self._bindings) > _MAX_BINDINGS:
+                self._bindings.popitem(last=False)
+        return bound
+
+    def _route(self, input):
+        messages = input.to_messages() if isinstance(input, PromptValue) else list(input)
+        names = self.select_tools(messages)
+        metrics.incr("tool_router.calls")
+        metrics.incr("tool_router.tools_bound", len(names) + 1)
+        metrics.incr("tool_router.tools_total", len(self.tools_by_name) + 1)
+        if any(isinstance(m, ToolMessage) and m.name == FIND_TOOLS_NAME for m in messages[-1:]):
+            metrics.incr("tool_router.expansions")
+        return self.bound_model(names), messages
+
+    def invoke(self, input, config=None, **kwargs):
+        bound, messages = self._route(input)
+        return bound.invoke(messages, config, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        bound, messages = self._route(input)
+        return await bound.ainvoke(messages, config, **kwargs)
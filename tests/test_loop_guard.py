@@ -0,0 +1,74 @@
+import asyncio
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import create_react_agent
+from core.loop_guard import _STOPPED, make_loop_guard_hook
+
+
+class LoopingModel(BaseChatModel):
+    """Chama sempre a mesma ferramenta com os mesmos argumentos."""
+
+    @property
+    def _llm_type(self):
+        return "looping"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        step = sum(m.type == "ai" for m in messages)
+        message = AIMessage(
+            content="Let me check.", tool_calls=[{"name": "lookup", "args": {"query": "x"}, "id": f"call-{step}"}]
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _looping_agent(calls, max_repeats=2):
+    @tool
+    def lookup(query: str) -> str:
+        """Look something up."""
+        calls.append(query)
+        return f"result for {query}"
+
+    return create_react_agent(
+        LoopingModel(), [lookup], checkpointer=MemorySaver(), post_model_hook=make_loop_guard_hook(max_repeats)
+    )
+
+
+async def _stream(agent, config):
+    streamed = []
+    async for chunk, _ in agent.astream({"messages": [("user", "find x")]}, config, stream_mode="messages"):
+        if isinstance(chunk.content, str) and chunk.type in ("ai", "AIMessageChunk"):
+            streamed.append(chunk.content)
+    return "".join(streamed)
+
+
+def test_stopped_turn_streams_partial_answer():
+    calls = []
+    agent = _looping_agent(calls)
+    config = {"configurable": {"thread_id": "loop"}}
+    streamed = asyncio.run(_stream(agent, config))
+
+    assert calls == ["x"]
+    assert _STOPPED in streamed
+    assert "result for x" in streamed
+
+    messages = agent.get_state(config).values["messages"]
+    last = messages[-1]
+    assert isinstance(last, AIMessage) and _STOPPED in last.content and not last.tool_calls
+    # A resposta do modelo trocada pela parcial sai do histórico.
+    assert sum(bool(m.type == "ai" and m.tool_calls) for m in messages) == sum(m.type == "tool" for m in messages)
+
+
+def test_repeated_call_is_answered_without_running_tool():
+    calls = []
+    agent = _looping_agent(calls, max_repeats=5)
+    config = {"configurable": {"thread_id": "nudge"}}
+    asyncio.run(_stream(agent, config))
+
+    tool_messages = [m for m in agent.get_state(config).values["messages"] if m.type == "tool"]
+    assert calls == ["x"]
+    assert any(m.additional_kwargs.get("loop_guard") == "repeat" for m in tool_messages)
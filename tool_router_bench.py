@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from core.agent import McpConnection, create_model, probe_mcp_servers
+from core.prompt_cache import bind_tools_for_caching, build_system_prompt, sort_tools
+from core.tool_router import ToolRouter
+
+# Mede o ganho do roteador de ferramentas: tokens de schema enviados por chamada
+# (todas as ferramentas x selecionadas) e, com --model, TTFT e latência reais.
+#
+#   python tool_router_bench.py queries.jsonl --config config.json --top-k 8
+#   python tool_router_bench.py queries.jsonl --model gpt-4o-mini --repeat 3
+#
+# O arquivo de perguntas usa o mesmo formato do batch_runner.py.
+
+
+def read_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                yield item if isinstance(item, str) else item.get("query") or item.get("question") or ""
+
+
+def schema_tokens(tools):
+    return sum(len(json.dumps(convert_to_openai_tool(tool))) // 4 for tool in tools)
+
+
+async def time_model(model, query, model_name):
+    system = build_system_prompt(model_name)
+    if isinstance(system, str):
+        system = SystemMessage(content=system)
+    messages = [system, HumanMessage(content=query)]
+    start = time.perf_counter()
+    first_token, input_tokens = None, None
+    async for chunk in model.astream(messages):
+        if first_token is None and (chunk.content or chunk.tool_call_chunks):
+            first_token = time.perf_counter() - start
+        if chunk.usage_metadata:
+            input_tokens = chunk.usage_metadata.get("input_tokens")
+    return first_token, time.perf_counter() - start, input_tokens
+
+
+def summarize(label, values, digits):
+    values = [v for v in values if v is not None]
+    if not values:
+        return f"{label}: n/a"
+    return f"{label}: mean {statistics.mean(values):.{digits}f}, p50 {statistics.median(values):.{digits}f}"
+
+
+async def main(args):
+    with open(args.config, "r", encoding="utf-8") as f:
+        mcp_config = await probe_mcp_servers(json.load(f))
+    connection = McpConnection(mcp_config)
+    tools = sort_tools(await connection.start())
+    queries = list(read_queries(args.input))
+    try:
+        model = create_model(args.model) if args.model else None
+        router = ToolRouter(model, tools, args.model, top_k=args.top_k, pinned=args.pinned)
+        full_tokens = schema_tokens(tools)
+        print(f"{len(tools)} tools, {full_tokens} schema tokens when all are bound\n")
+
+        routed_tokens, selection_times, bound_counts = [], [], []
+        for query in queries:
+            start = time.perf_counter()
+            names = router.select_tools([HumanMessage(content=query)])
+            selection_times.append(time.perf_counter() - start)
+            selected = [router.tools_by_name[name] for name in sorted(names)] + [router.find_tools]
+            routed_tokens.append(schema_tokens(selected))
+            bound_counts.append(len(selected))
+            print(f"- {query[:60]!r}: {', '.join(sorted(names)) or '(pinned only)'}")
+
+        print(f"\nTools bound per call: mean {statistics.mean(bound_counts):.1f} of {len(tools)}")
+        print(f"Schema tokens per call: {full_tokens} -> mean {statistics.mean(routed_tokens):.0f}")
+        print(f"Selection time: mean {statistics.mean(selection_times) * 1000:.2f}ms")
+
+        if model is None:
+            return
+        full = bind_tools_for_caching(model, tools, args.model)
+        results = {"all tools": ([], [], []), "routed": ([], [], [])}
+        for _ in range(args.repeat):
+            for query in queries:
+                routed = router.bound_model(router.select_tools([HumanMessage(content=query)]))
+                for label, bound in (("all tools", full), ("routed", routed)):
+                    ttft, latency, input_tokens = await time_model(bound, query, args.model)
+                    results[label][0].append(ttft)
+                    results[label][1].append(latency)
+                    results[label][2].append(input_tokens)
+        print(f"\nModel {args.model}, {args.repeat} x {len(queries)} queries:")
+        for label, (ttfts, latencies, input_tokens) in results.items():
+            print(f"  {label}")
+            print(f"    {summarize('TTFT (s)', ttfts, 3)}")
+            print(f"    {summarize('Latency (s)', latencies, 3)}")
+            print(f"    {summarize('Input tokens', input_tokens, 0)}")
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description="Benchmark per-query tool routing against binding every tool.")
+    parser.add_argument("input", help="JSONL file with one query per line")
+    parser.add_argument("--config", default="config.json", help="MCP servers configuration")
+    parser.add_argument("--model", default=None, help="Also measure TTFT and latency with this model")
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--pinned", nargs="*", default=[], help="Tool names always bound")
+    parser.add_argument("--repeat", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import httpx
+
+# Teste de carga do servidor: dispara POST / (ou POST /batch com --batch) em níveis
+# fixos de concorrência e mede p50/p95/p99, vazão e chamadas à API por requisição.
+# Para não gastar quota, rode o servidor apontando para o mock_backend.py:
+#
+#   uvicorn mock_backend:app --port 5099
+#   YOUTUBE_API_BASE_URL=http://localhost:5099 YOUTUBE_API_KEY=test python main.py
+#   python bench.py --mock-url http://localhost:5099 --concurrency 1,8,32 --requests 500
+#
+# --workload aceita um JSONL de {"tool": ..., "parameters": {...}}; sem ele, usa uma
+# mistura sintética com IDs repetidos em distribuição de cauda longa.
+
+VIDEO_POOL = [f"vid{i:04d}" for i in range(300)]
+VIDEO_WEIGHTS = [1 / (i + 1) for i in range(len(VIDEO_POOL))]
+QUERIES = ["lofi hip hop", "python asyncio", "langgraph agents", "mcp server", "fastapi tutorial"]
+REGIONS = ["US", "BR", "KR", "GB", "IN"]
+
+
+def synthetic_workload(rng):
+    def videos(low, high):
+        return list(dict.fromkeys(rng.choices(VIDEO_POOL, VIDEO_WEIGHTS, k=rng.randint(low, high))))
+
+    while True:
+        roll = rng.random()
+        if roll < 0.5:
+            yield {"tool": "getVideoDetails", "parameters": {"videoIds": videos(1, 3)}}
+        elif roll < 0.7:
+            yield {"tool": "compareVideos", "parameters": {"videoIds": videos(2, 5)}}
+        elif roll < 0.8:
+            yield {"tool": "getVideoEngagementRatio", "parameters": {"videoIds": videos(1, 2)}}
+        elif roll < 0.9:
+            yield {"tool": "searchVideos", "parameters": {"query": rng.choice(QUERIES)}}
+        else:
+            yield {"tool": "getTrendingVideos", "parameters": {"regionCode": rng.choice(REGIONS)}}
+
+
+def file_workload(path):
+    with open(path, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    while True:
+        yield from items
+
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+async def upstream_counters(client, server_url, mock_url):
+    metrics = (await client.get(f"{server_url}/metrics/json")).json()
+    counters = {"quota_units": metrics.get("upstream", {}).get("quota_units", 0)}
+    counters["server_upstream_calls"] = sum(
+        v for k, v in metrics.get("upstream", {}).items() if k.startswith("calls.")
+    )
+    if mock_url:
+        counters["mock_calls"] = (await client.get(f"{mock_url}/_stats")).json().get("total", 0)
+    return counters
+
+
+async def run_level(client, args, workload, concurrency):
+    requests_left = args.requests
+    latencies, errors = [], 0
+
+    async def send():
+        if args.batch > 1:
+            payload = [next(workload) for _ in range(args.batch)]
+            response = await client.post(f"{args.url}/batch", json=payload)
+            failed = response.status_code != 200 or any("error" in r for r in response.json()["results"])
+        else:
+            response = await client.post(f"{args.url}/", json=next(workload))
+            failed = response.status_code != 200 or (isinstance(response.json(), dict) and "error" in response.json())
+        return failed
+
+    async def worker():
+        nonlocal requests_left, errors
+        while requests_left > 0:
+            requests_left -= 1
+            start = time.perf_counter()
+            try:
+                failed = await send()
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    before = await upstream_counters(client, args.url, args.mock_url)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    after = await upstream_counters(client, args.url, args.mock_url)
+
+    calls = args.requests * max(1, args.batch)
+    upstream = {k: after[k] - before.get(k, 0) for k in after}
+    return {
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "tool_calls": calls,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": args.requests / elapsed,
+        **upstream,
+        "upstream_per_call": upstream.get("mock_calls", upstream["server_upstream_calls"]) / calls,
+    }
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    workload = file_workload(args.workload) if args.workload else synthetic_workload(rng)
+    levels = [int(c) for c in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for concurrency in levels:
+            result = await run_level(client, args, workload, concurrency)
+            results.append(result)
+            print(
+                f"c={concurrency:<4} p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                f"p99 {result['p99_ms']:8.1f} ms  {result['throughput_rps']:8.1f} req/s  "
+                f"errors {result['errors']:<4} upstream/call {result['upstream_per_call']:.3f}  "
+                f"quota {result['quota_units']}"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load benchmark for the YouTube MCP server.")
+    parser.add_argument("--url", default="http://localhost:5002", help="YouTube server base URL")
+    parser.add_argument("--mock-url", default="", help="mock_backend.py URL, to count the calls it received")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--batch", type=int, default=1, help="invocations per POST /batch (1 = POST /)")
+    parser.add_argument("--workload", default="", help="JSONL of {tool, parameters}; default is a synthetic mix")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", default="", help="write the results as JSON")
+    asyncio.run(main(parser.parse_args()))
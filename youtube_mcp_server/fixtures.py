@@ -0,0 +1,38 @@
+import hashlib
+import httpx
+import json
+import os
+
+# Respostas gravadas da API do YouTube, usadas pelo mock_backend.py.
+#
+# Com YOUTUBE_RECORD_DIR definido, cada resposta 200 da API real é gravada em
+# <dir>/<endpoint>/<hash dos parâmetros>.json (sem a chave da API), pronta para o
+# mock servir depois.
+
+RECORD_DIR = os.getenv("YOUTUBE_RECORD_DIR", "")
+
+
+def fixture_name(params):
+    """Nome do arquivo a partir dos parâmetros como vão na URL (dict ou pares), sem a chave."""
+    items = sorted((k, v) for k, v in httpx.QueryParams(params).multi_items() if k != "key")
+    digest = hashlib.sha1(json.dumps(items).encode("utf-8")).hexdigest()
+    return digest[:16] + ".json"
+
+
+def fixture_path(directory, endpoint, params):
+    return os.path.join(directory, endpoint.strip("/"), fixture_name(params))
+
+
+def save_fixture(directory, endpoint, params, body):
+    path = fixture_path(directory, endpoint, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(body, f, ensure_ascii=False)
+
+
+def load_fixture(directory, endpoint, params):
+    path = fixture_path(directory, endpoint, params)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
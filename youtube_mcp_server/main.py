@@ -1,29 +1,107 @@
-from fastapi import FastAPI, Request
-from tools import (
-    getVideoDetails, searchVideos, getTranscripts, getRelatedVideos,
-    getChannelStatistics, getChannelTopVideos, getVideoEngagementRatio,
-    getTrendingVideos, compareVideos
+import asyncio
+import httpx
+import json
+import os
+import uvicorn
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from mcp.server.fastmcp import FastMCP
+from observability import Counter, RequestIdMiddleware, configure_logging, from_snapshot, instrument_tool, render
+from youtube_utils import QuotaExceeded, close_client, get_cache, limiter, open_client, upstream_stats
+from tools import TOOLS as TOOL_FUNCTIONS
+from transcripts import TranscriptNotFound, TranscriptsUnavailable
+from video_stats import stats_store
+
+# Lote em POST /batch: chamadas em paralelo, no máximo BATCH_CONCURRENCY por vez.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+configure_logging()
+
+# Ferramentas instrumentadas (contagem, latência, chamadas em andamento), usadas por
+# todas as rotas: POST /, POST /batch e /mcp/.
+TOOLS = {name: instrument_tool(name, run) for name, run in TOOL_FUNCTIONS.items()}
+
+# Servidor MCP nativo (streamable HTTP) em /mcp/, com as ferramentas do registro.
+# Sem estado de sessão entre requisições, então qualquer worker do uvicorn atende
+# qualquer chamada.
+mcp = FastMCP(
+    "YouTube",
+    instructions="Tools for searching YouTube and reading video, channel and transcript data.",
+    stateless_http=True,
+    streamable_http_path="/",
 )
+for name, run in TOOLS.items():
+    mcp.add_tool(run, name=name)
+mcp_app = mcp.streamable_http_app()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Um único pool de conexões com a API do YouTube para todo o processo.
+    await open_client()
+    async with mcp.session_manager.run():
+        yield
+    await close_client()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+app.mount("/mcp", mcp_app)
+app.add_middleware(RequestIdMiddleware)
+
+@app.exception_handler(QuotaExceeded)
+async def quota_exceeded(request: Request, exc: QuotaExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+@app.exception_handler(TranscriptsUnavailable)
+async def transcripts_unavailable(request: Request, exc: TranscriptsUnavailable):
+    return JSONResponse(status_code=501, content={"error": str(exc)})
+
+@app.exception_handler(TranscriptNotFound)
+async def transcript_not_found(request: Request, exc: TranscriptNotFound):
+    return JSONResponse(status_code=404, content={"error": str(exc), "reason": exc.reason})
 
 @app.get("/")
 def root():
     return {"message": "🧠 YouTube MCP Server rodando com FastAPI."}
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato de texto do Prometheus (deste worker)."""
+    cache, quota, video_stats = get_cache().snapshot(), limiter.snapshot(), stats_store.snapshot()
+    extra = [
+        from_snapshot("youtube_cache_events_total", "Response cache events (hits, misses, revalidations).",
+                      {k: v for k, v in cache.items() if k not in ("entries", "revalidating", "hit_ratio")},
+                      "event", Counter),
+        from_snapshot("youtube_cache_hit_ratio", "Response cache hit ratio.", cache["hit_ratio"] or 0),
+        from_snapshot("youtube_cache_entries", "Responses stored in the on-disk cache.", cache["entries"]),
+        from_snapshot("youtube_cache_revalidating", "Background revalidations in flight.", cache["revalidating"]),
+        from_snapshot("youtube_video_stats_lookups_total", "Video stats store lookups.",
+                      {k: v for k, v in video_stats.items() if k != "entries"}, "result", Counter),
+        from_snapshot("youtube_upstream_events_total", "Upstream calls per endpoint, quota units, dedupe and coalescing.",
+                      dict(upstream_stats), "event", Counter),
+        from_snapshot("youtube_quota_remaining_units", "Quota units left today.", quota["remaining_today"]),
+        from_snapshot("youtube_quota_queue_depth", "Calls waiting for quota tokens.", quota["queue_depth"]),
+        from_snapshot("youtube_quota_tokens", "Quota tokens in the bucket.", quota["tokens"]),
+    ]
+    return PlainTextResponse(render(extra), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/json")
+async def metrics_json():
+    return {"cache": get_cache().snapshot(), "upstream": dict(upstream_stats), "quota": limiter.snapshot(),
+            "video_stats": stats_store.snapshot()}
+
 @app.get("/metadata")
-def metadata():
+async def metadata():
     return {
         "tools": [
-            {"name": "getVideoDetails", "description": "Obtém detalhes de vídeos"},
-            {"name": "searchVideos", "description": "Pesquisa vídeos"},
-            {"name": "getTranscripts", "description": "Obtém transcrição de vídeos"},
-            {"name": "getRelatedVideos", "description": "Obtém vídeos relacionados"},
-            {"name": "getChannelStatistics", "description": "Estatísticas de canais"},
-            {"name": "getChannelTopVideos", "description": "Top vídeos do canal"},
-            {"name": "getVideoEngagementRatio", "description": "Engajamento do vídeo"},
-            {"name": "getTrendingVideos", "description": "Vídeos em alta"},
-            {"name": "compareVideos", "description": "Compara dois vídeos"}
+            {"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+            for tool in await mcp.list_tools()
         ]
     }
 
@@ -32,17 +110,71 @@ async def invoke_tool(request: Request):
     body = await request.json()
     tool = body.get("tool")
     parameters = body.get("parameters", {})
-    tools = {
-        "getVideoDetails": getVideoDetails.run,
-        "searchVideos": searchVideos.run,
-        "getTranscripts": getTranscripts.run,
-        "getRelatedVideos": getRelatedVideos.run,
-        "getChannelStatistics": getChannelStatistics.run,
-        "getChannelTopVideos": getChannelTopVideos.run,
-        "getVideoEngagementRatio": getVideoEngagementRatio.run,
-        "getTrendingVideos": getTrendingVideos.run,
-        "compareVideos": compareVideos.run,
-    }
-    if tool not in tools:
+    if tool not in TOOLS:
         return {"error": f"Ferramenta '{tool}' não encontrada."}
-    return tools[tool](**parameters)
+    try:
+        return await TOOLS[tool](**parameters)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters for '{tool}': {e}")
+
+async def _invoke_item(index, item, semaphore):
+    if not isinstance(item, dict) or not isinstance(item.get("parameters", {}), dict):
+        return {"index": index, "error": "Expected a {tool, parameters} object."}
+    tool = item.get("tool")
+    if tool not in TOOLS:
+        return {"index": index, "tool": tool, "error": f"Ferramenta '{tool}' não encontrada."}
+    async with semaphore:
+        try:
+            result = await TOOLS[tool](**item.get("parameters", {}))
+        except httpx.HTTPStatusError as e:
+            # A URL da requisição leva a chave da API; devolve só o status.
+            return {"index": index, "tool": tool, "error": f"Upstream HTTP {e.response.status_code}"}
+        except Exception as e:
+            return {"index": index, "tool": tool, "error": f"{type(e).__name__}: {e}"}
+    return {"index": index, "tool": tool, "result": result}
+
+@app.post("/batch")
+async def invoke_batch(request: Request, stream: bool = False):
+    """
+    Executa várias chamadas {tool, parameters} em paralelo. Sem `stream`, devolve
+    {"results": [...]} na ordem do pedido; com `?stream=true`, devolve NDJSON, uma
+    linha por chamada assim que ela termina (com o `index` original). Erros ficam no
+    item, sem derrubar o lote.
+    """
+    body = await request.json()
+    options = body if isinstance(body, dict) else {"invocations": body}
+    invocations = options.get("invocations")
+    if not isinstance(invocations, list):
+        raise HTTPException(status_code=400, detail="Expected a list of {tool, parameters} invocations.")
+    if len(invocations) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} invocations per batch.")
+    try:
+        concurrency = max(1, min(int(options.get("concurrency", BATCH_CONCURRENCY)), BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="`concurrency` must be an integer.")
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(_invoke_item(i, item, semaphore)) for i, item in enumerate(invocations)]
+
+    if not stream:
+        return {"results": await asyncio.gather(*tasks)}
+
+    async def ndjson():
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+if __name__ == "__main__":
+    # Vários workers: cada um tem seu cliente HTTP e seu limitador de quota; o cache
+    # em SQLite é compartilhado.
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "5002")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+    )
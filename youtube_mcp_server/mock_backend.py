@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import zlib
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from fixtures import load_fixture
+
+# Substituto local da YouTube Data API para testes de carga sem gastar quota.
+#
+# Serve as respostas gravadas em MOCK_FIXTURES_DIR (veja fixtures.py); sem gravação
+# para o pedido, gera uma resposta determinística (no recurso `videos`, um item por
+# ID pedido). Latência, erros 500 e erros de quota (403 quotaExceeded) são
+# configuráveis, e ETag/If-None-Match funcionam como na API.
+#
+#   uvicorn mock_backend:app --port 5099
+#   YOUTUBE_API_BASE_URL=http://localhost:5099 YOUTUBE_API_KEY=test python main.py
+#
+# GET /_stats mostra as chamadas recebidas por endpoint; POST /_reset zera.
+
+FIXTURES_DIR = os.getenv("MOCK_FIXTURES_DIR", "recordings")
+LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "80"))
+JITTER_MS = float(os.getenv("MOCK_LATENCY_JITTER_MS", "40"))
+# Cauda lenta: uma fração das respostas demora MOCK_SLOW_MS.
+SLOW_RATE = float(os.getenv("MOCK_SLOW_RATE", "0.01"))
+SLOW_MS = float(os.getenv("MOCK_SLOW_MS", "1500"))
+ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+QUOTA_ERROR_RATE = float(os.getenv("MOCK_QUOTA_ERROR_RATE", "0"))
+
+app = FastAPI()
+stats = Counter()
+
+
+def _number(seed, low, high):
+    return low + zlib.crc32(seed.encode("utf-8")) % (high - low)
+
+
+def _video(video_id):
+    views = _number(video_id, 1_000, 5_000_000)
+    return {
+        "kind": "youtube#video",
+        "id": video_id,
+        "snippet": {
+            "title": f"Mock video {video_id}",
+            "channelId": f"UC{video_id[:8]}",
+            "channelTitle": f"Mock channel {video_id[:4]}",
+            "publishedAt": "2024-01-01T00:00:00Z",
+        },
+        "statistics": {
+            "viewCount": str(views),
+            "likeCount": str(views // _number(video_id + "l", 15, 60)),
+            "commentCount": str(views // _number(video_id + "c", 200, 2000)),
+        },
+        "contentDetails": {"duration": f"PT{_number(video_id + 'd', 1, 59)}M{_number(video_id + 's', 0, 59)}S"},
+    }
+
+
+def synthesize(endpoint, params):
+    if endpoint == "videos":
+        ids = [i for i in params.get("id", "").split(",") if i and not i.startswith("missing")]
+        return {"kind": "youtube#videoListResponse", "items": [_video(i) for i in ids]}
+    count = int(params.get("maxResults", 10))
+    seed = endpoint + json.dumps(params, sort_keys=True)
+    return {
+        "kind": f"youtube#{endpoint}Response",
+        "items": [_video(f"{zlib.crc32(seed.encode('utf-8')):08x}{i:03d}") for i in range(count)],
+    }
+
+
+@app.get("/_stats")
+def get_stats():
+    calls = {k.split(".", 1)[1]: v for k, v in stats.items() if k.startswith("calls.")}
+    return {**{k: v for k, v in stats.items() if not k.startswith("calls.")}, "calls": calls}
+
+
+@app.post("/_reset")
+def reset():
+    stats.clear()
+    return {"ok": True}
+
+
+@app.get("/{endpoint:path}")
+async def api(endpoint: str, request: Request):
+    params = dict(request.query_params)
+    stats["total"] += 1
+    stats[f"calls.{endpoint}"] += 1
+    delay = SLOW_MS if random.random() < SLOW_RATE else LATENCY_MS + random.uniform(0, JITTER_MS)
+    await asyncio.sleep(delay / 1000)
+
+    if not params.get("key"):
+        return JSONResponse(status_code=400, content={"error": {"code": 400, "message": "API key missing."}})
+    if random.random() < QUOTA_ERROR_RATE:
+        stats["quota_errors"] += 1
+        return JSONResponse(
+            status_code=403,
+            content={"error": {"code": 403, "errors": [{"reason": "quotaExceeded"}], "message": "Quota exceeded."}},
+        )
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"code": 500, "message": "Injected error."}})
+
+    body = load_fixture(FIXTURES_DIR, endpoint, request.query_params.multi_items())
+    if body is None:
+        stats["synthesized"] += 1
+        body = synthesize(endpoint, params)
+    else:
+        stats["fixtures"] += 1
+    etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()[:16] + '"'
+    if request.headers.get("If-None-Match") == etag:
+        stats["not_modified"] += 1
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content=body, headers={"ETag": etag})
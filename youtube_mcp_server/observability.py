@@ -0,0 +1,200 @@
+import contextvars
+import functools
+import logging
+import math
+import time
+import uuid
+
+# Métricas no formato de texto do Prometheus e rastreio por ID de requisição.
+#
+# Contadores, gauges e histogramas ficam em memória, por processo (com vários
+# workers, cada scrape vê um worker). O ID de requisição vem do cabeçalho
+# X-Request-ID (ou é gerado), volta na resposta e aparece em todo log emitido
+# durante a requisição, inclusive nas tarefas filhas.
+
+REQUEST_ID_HEADER = "x-request-id"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+request_id = contextvars.ContextVar("request_id", default="-")
+logger = logging.getLogger("youtube_mcp")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total) in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {counts[-1]}")
+        return lines
+
+
+tool_requests = Counter("youtube_mcp_tool_requests_total", "Tool calls by tool and outcome.", ("tool", "outcome"))
+tool_latency = Histogram("youtube_mcp_tool_latency_seconds", "Tool call latency.", ("tool",))
+tool_in_flight = Gauge("youtube_mcp_tool_in_flight", "Tool calls currently running.", ("tool",))
+http_in_flight = Gauge("youtube_mcp_http_in_flight", "HTTP requests currently being served.")
+upstream_responses = Counter(
+    "youtube_api_responses_total", "YouTube API responses by endpoint and HTTP status.", ("endpoint", "status")
+)
+upstream_latency = Histogram("youtube_api_latency_seconds", "YouTube API call latency.", ("endpoint",))
+
+METRICS = [tool_requests, tool_latency, tool_in_flight, http_in_flight, upstream_responses, upstream_latency]
+
+
+def render(extra=()):
+    """Texto de exposição do Prometheus: as métricas acima mais `extra` (gauges montados no scrape)."""
+    lines = []
+    for metric in list(METRICS) + list(extra):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def from_snapshot(name, help, values, label=None, kind=Gauge):
+    """Métrica montada no scrape a partir de um valor ou de um dict {rótulo: valor}."""
+    metric = kind(name, help, (label,) if label else ())
+    for key, value in (values.items() if label else [(None, values)]):
+        metric.values[metric._key({label: key} if label else {})] = value
+    return metric
+
+
+def instrument_tool(name, run):
+    """Envolve `run` com contagem, latência, gauge de chamadas em andamento e log; mantém a assinatura."""
+
+    @functools.wraps(run)
+    async def wrapper(*args, **kwargs):
+        tool_in_flight.inc(tool=name)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await run(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            tool_in_flight.dec(tool=name)
+            tool_requests.inc(tool=name, outcome=outcome)
+            tool_latency.observe(elapsed, tool=name)
+            logger.info("tool=%s outcome=%s duration_ms=%.1f", name, outcome, elapsed * 1000)
+
+    return wrapper
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+def configure_logging(level=logging.INFO):
+    handler = logging.StreamHandler()
+    handler.addFilter(_RequestIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+class RequestIdMiddleware:
+    """Middleware ASGI: define o ID da requisição, devolve-o no cabeçalho e loga cada requisição."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        rid = headers.get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")[:128] or uuid.uuid4().hex
+        token = request_id.set(rid)
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER.encode(), rid.encode())]
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            http_in_flight.dec()
+            logger.info(
+                "%s %s status=%s duration_ms=%.1f",
+                scope["method"], scope["path"], status["code"], (time.perf_counter() - start) * 1000,
+            )
+            request_id.reset(token)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# Cache persistente das respostas da API do YouTube.
+#
+# Cada resposta fica em SQLite com o ETag. Dentro do TTL do endpoint ela é servida
+# direto; depois disso, até YOUTUBE_CACHE_STALE segundos, é servida na hora enquanto
+# uma revalidação roda em segundo plano (stale-while-revalidate). Mais velha que isso,
+# a revalidação é feita antes de responder. Revalidar envia If-None-Match, e um 304
+# só renova a data da entrada. O SQLite roda fora do event loop (asyncio.to_thread),
+# com uma conexão protegida por lock.
+
+CACHE_DB = os.getenv("YOUTUBE_CACHE_DB", ".youtube_cache.sqlite")
+STALE_SECONDS = float(os.getenv("YOUTUBE_CACHE_STALE", str(24 * 3600)))
+DEFAULT_TTL = 300
+
+TTLS = {
+    "videos": 3600,
+    "getChannelStatistics": 3600,
+    "getChannelTopVideos": 3600,
+    "getRelatedVideos": 6 * 3600,
+    "transcript": 7 * 24 * 3600,
+    "searchVideos": 900,
+    "getTrendingVideos": 600,
+}
+# Ajustes por endpoint, em JSON: YOUTUBE_CACHE_TTLS='{"searchVideos": 60, "getTrendingVideos": 0}'
+TTLS.update(json.loads(os.getenv("YOUTUBE_CACHE_TTLS", "{}")))
+
+
+def cache_key(endpoint, params):
+    return endpoint + "?" + json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_DB, ttls=TTLS, stale_seconds=STALE_SECONDS):
+        self.ttls = ttls
+        self.stale_seconds = stale_seconds
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, endpoint TEXT, etag TEXT, body TEXT, fetched_at REAL)"
+        )
+        self._revalidating = {}
+
+    def _load(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT etag, body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]), row[2])
+
+    def _store(self, key, endpoint, etag, body):
+        row = (key, endpoint, etag, json.dumps(body), time.time())
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", row)
+            self._conn.commit()
+
+    def _touch(self, key):
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    async def _revalidate(self, key, endpoint, params, etag, body, request):
+        """Busca de novo com If-None-Match; `request` devolve (corpo ou None se 304, etag)."""
+        new_body, new_etag = await request(endpoint, params, etag)
+        if new_body is None:
+            self.stats["revalidated_not_modified"] += 1
+            await asyncio.to_thread(self._touch, key)
+            return body
+        self.stats["revalidated_modified" if etag else "fetched"] += 1
+        await asyncio.to_thread(self._store, key, endpoint, new_etag, new_body)
+        return new_body
+
+    def _revalidate_in_background(self, key, endpoint, params, etag, body, request):
+        if key in self._revalidating:
+            return
+
+        async def run():
+            try:
+                await self._revalidate(key, endpoint, params, etag, body, request)
+            except Exception as e:
+                self.stats["revalidation_errors"] += 1
+                print(f"[WARN] Falha ao revalidar {endpoint}: {e}")
+            finally:
+                self._revalidating.pop(key, None)
+
+        self._revalidating[key] = asyncio.create_task(run())
+
+    async def fetch(self, endpoint, params, request):
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+        if ttl <= 0:
+            self.stats["bypass"] += 1
+            body, _ = await request(endpoint, params, None)
+            return body
+
+        key = cache_key(endpoint, params)
+        entry = await asyncio.to_thread(self._load, key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return await self._revalidate(key, endpoint, params, None, None, request)
+
+        etag, body, fetched_at = entry
+        age = time.time() - fetched_at
+        if age < ttl:
+            self.stats["hits_fresh"] += 1
+            return body
+        if age < ttl + self.stale_seconds:
+            self.stats["hits_stale"] += 1
+            self._revalidate_in_background(key, endpoint, params, etag, body, request)
+            return body
+        self.stats["expired"] += 1
+        return await self._revalidate(key, endpoint, params, etag, body, request)
+
+    def snapshot(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        hits = self.stats["hits_fresh"] + self.stats["hits_stale"]
+        lookups = hits + self.stats["misses"] + self.stats["expired"]
+        return {
+            **self.stats,
+            "entries": entries,
+            "revalidating": len(self._revalidating),
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+    async def close(self):
+        for task in list(self._revalidating.values()):
+            task.cancel()
+        await asyncio.gather(*self._revalidating.values(), return_exceptions=True)
+        with self._lock:
+            self._conn.close()
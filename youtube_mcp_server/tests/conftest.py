@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos do servidor se importam pelo nome (youtube_utils, transcripts, ...).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from tools import TOOLS
+from transcripts import _stem, _terms, matching_segments, window
+
+SEGMENTS = [{"start": i * 10.0, "end": i * 10.0 + 10, "text": f"segment {i}"} for i in range(10)]
+
+
+@pytest.mark.parametrize(
+    "words",
+    [
+        ("price", "prices", "priced", "pricing"),
+        ("make", "makes", "making"),
+        ("need", "needs", "needed", "needing"),
+        ("class", "classes"),
+        ("build", "builds", "building", "buildings"),
+        ("release", "releases", "released"),
+    ],
+)
+def test_regular_inflections_share_a_stem(words):
+    assert len({_stem(word) for word in words}) == 1
+
+
+@pytest.mark.parametrize("a, b", [("use", "used"), ("make", "made"), ("run", "running")])
+def test_short_and_irregular_forms_are_not_matched(a, b):
+    assert _stem(a) != _stem(b)
+
+
+def test_stopwords_do_not_match():
+    segments = [{"text": "what is the price"}, {"text": "what a day"}, {"text": "they changed pricing"}]
+    assert _terms("what is the price") == {"pric"}
+    assert matching_segments(segments, "what pricing", context=0) == [0, 2]
+
+
+def _read_all(**kwargs):
+    pages, cursor = [], 0
+    while cursor is not None:
+        page, cursor = window(SEGMENTS, cursor=cursor, **kwargs)
+        pages.append([segment["index"] for segment in page])
+    return pages
+
+
+def test_cursor_pages_through_every_segment_once():
+    assert _read_all(max_segments=4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_max_chars_caps_page_but_always_returns_one_segment():
+    assert _read_all(max_chars=20) == [[i, i + 1] for i in range(0, 10, 2)]
+    assert _read_all(max_chars=1)[0] == [0]
+
+
+def test_time_window_and_query_combine_with_cursor():
+    page, cursor = window(SEGMENTS, start=25, end=55, max_segments=2)
+    assert [s["index"] for s in page] == [2, 3] and cursor == 4
+    page, cursor = window(SEGMENTS, start=25, end=55, cursor=cursor, max_segments=2)
+    assert [s["index"] for s in page] == [4, 5] and cursor is None
+
+    segments = [{**s, "text": "the pricing changed" if i in (2, 7) else "hello"} for i, s in enumerate(SEGMENTS)]
+    page, cursor = window(segments, query="prices", max_segments=4)
+    assert [s["index"] for s in page] == [1, 2, 3, 6] and cursor == 7
+    page, cursor = window(segments, query="prices", cursor=cursor, max_segments=4)
+    assert [s["index"] for s in page] == [7, 8] and cursor is None
+    assert window(segments, query="nothing") == ([], None)
+
+
+def test_tool_rejects_malformed_cursor():
+    with pytest.raises(ValueError):
+        asyncio.run(TOOLS["getTranscripts"](videoId="v", cursor="abc"))
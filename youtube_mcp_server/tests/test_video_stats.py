@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from tools import TOOLS
+from video_stats import VideoStatsStore, engagement_table, stats_store, table_records
+
+ROWS = [
+    ("a", "A", "ch", 1000, 10, 0),
+    ("b", "B", "ch", 0, 0, 0),
+    ("c", "C", "ch", 100, 20, 5),
+]
+
+
+def _video(video_id, views, likes, comments):
+    return {
+        "id": video_id,
+        "snippet": {"title": video_id.upper()},
+        "statistics": {"viewCount": str(views), "likeCount": str(likes), "commentCount": str(comments)},
+    }
+
+
+def test_ranks_by_requested_column():
+    records = table_records(engagement_table(ROWS, sort_by="engagementRatio"))
+    assert [(r["rank"], r["videoId"]) for r in records] == [(1, "c"), (2, "a"), (3, "b")]
+    assert records[0]["engagementRatio"] == 0.25
+
+    records = table_records(engagement_table(ROWS))
+    assert [r["videoId"] for r in records] == ["a", "c", "b"]
+
+
+def test_zero_views_give_none_ratios_ranked_last():
+    record = table_records(engagement_table(ROWS, sort_by="likeRatio"))[-1]
+    assert record["videoId"] == "b"
+    assert record["likeRatio"] is record["commentRatio"] is record["engagementRatio"] is None
+
+
+def test_zero_engagement_ranks_above_unknown():
+    rows = [("z", "Z", "ch", 0, 0, 0), ("q", "Q", "ch", 50, 0, 0)]
+    records = table_records(engagement_table(rows, sort_by="engagementRatio"))
+    assert [(r["videoId"], r["engagementRatio"]) for r in records] == [("q", 0.0), ("z", None)]
+
+
+def test_rejects_unknown_sort_key():
+    with pytest.raises(ValueError):
+        engagement_table(ROWS, sort_by="title")
+
+
+def test_empty_table():
+    assert engagement_table([])["rows"] == []
+
+
+def test_store_counts_each_lookup_once_and_expires():
+    store = VideoStatsStore(ttl=60, max_entries=2)
+    for video in (_video("a", 1, 0, 0), _video("b", 1, 0, 0), _video("c", 1, 0, 0)):
+        store.put(video)
+    found, missing = store.get_many(["a", "b", "c"])
+    assert set(found) == {"b", "c"} and missing == ["a"]
+    store.get_many(["b"], record=False)
+    assert store.snapshot() == {"hits": 2, "misses": 1, "entries": 2}
+
+
+def test_compare_videos_reads_the_store():
+    for video in (_video("s1", 200, 0, 0), _video("s2", 100, 30, 10)):
+        stats_store.put(video)
+    result = asyncio.run(TOOLS["compareVideos"](videoIds=["s1", "s2"], sortBy="engagementRatio"))
+    assert [row[1] for row in result["rows"]] == ["s2", "s1"]
+    assert result["mostViewed"] == "s1" and result["mostEngaging"] == "s2"
+    assert result["notFound"] == []
@@ -0,0 +1,10 @@
+import importlib
+import pkgutil
+
+# Registro das ferramentas, montado uma vez na importação: cada módulo deste pacote
+# expõe `run` (assinatura tipada + docstring, que viram o schema e a descrição da
+# ferramenta MCP) e é registrado com o nome do módulo.
+TOOLS = {
+    module.name: importlib.import_module(f"{__name__}.{module.name}").run
+    for module in sorted(pkgutil.iter_modules(__path__), key=lambda m: m.name)
+}
@@ -1,4 +1,23 @@
-from youtube_utils import youtube_get
+from typing import List, Optional
+from video_stats import COLUMNS, SortKey, engagement_table
+from youtube_utils import get_video_stats, parse_video_ids
 
-def run(**kwargs):
-    return youtube_get("compareVideos", kwargs)
+_VIEWS, _ENGAGEMENT = COLUMNS.index("viewCount"), COLUMNS.index("engagementRatio")
+
+async def run(
+    videoIds: Optional[List[str]] = None, videoId: Optional[str] = None, sortBy: Optional[SortKey] = "viewCount"
+) -> dict:
+    """
+    Compare views, likes, comments and engagement ratios of several videos as a ranked
+    table, sorted by the sortBy column.
+    """
+    video_ids = parse_video_ids(videoIds, videoId)
+    rows = await get_video_stats(video_ids)
+    table = engagement_table([row for row in rows if row], sort_by=sortBy or "viewCount")
+    ranked = table["rows"]
+    return {
+        **table,
+        "mostViewed": max(ranked, key=lambda r: r[_VIEWS])[1] if ranked else None,
+        "mostEngaging": max(ranked, key=lambda r: -1 if r[_ENGAGEMENT] is None else r[_ENGAGEMENT])[1] if ranked else None,
+        "notFound": [video_id for video_id, row in zip(video_ids, rows) if not row],
+    }
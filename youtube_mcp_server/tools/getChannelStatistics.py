@@ -1,4 +1,6 @@
+from typing import List
 from youtube_utils import youtube_get
 
-def run(**kwargs):
-    return youtube_get("getChannelStatistics", kwargs)
+async def run(channelIds: List[str]) -> dict:
+    """Get subscriber, view and video counts for one or more channels."""
+    return await youtube_get("getChannelStatistics", {"channelIds": channelIds})
@@ -1,4 +1,6 @@
+from typing import Optional
 from youtube_utils import youtube_get
 
-def run(**kwargs):
-    return youtube_get("getChannelTopVideos", kwargs)
+async def run(channelId: str, maxResults: Optional[int] = 10) -> dict:
+    """Get the most viewed videos of a channel."""
+    return await youtube_get("getChannelTopVideos", {"channelId": channelId, "maxResults": maxResults})
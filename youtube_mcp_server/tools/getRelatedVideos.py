@@ -1,4 +1,6 @@
+from typing import Optional
 from youtube_utils import youtube_get
 
-def run(**kwargs):
-    return youtube_get("getRelatedVideos", kwargs)
+async def run(videoId: str, maxResults: Optional[int] = 10) -> dict:
+    """Get videos related to a given video."""
+    return await youtube_get("getRelatedVideos", {"videoId": videoId, "maxResults": maxResults})
@@ -1,4 +1,38 @@
-from youtube_utils import youtube_get
+from typing import Optional
+from transcripts import get_transcript, window
 
-def run(**kwargs):
-    return youtube_get("getTranscripts", kwargs)
+async def run(
+    videoId: str,
+    lang: Optional[str] = None,
+    startSeconds: Optional[float] = None,
+    endSeconds: Optional[float] = None,
+    query: Optional[str] = None,
+    cursor: Optional[str] = None,
+    maxSegments: Optional[int] = 50,
+    maxChars: Optional[int] = 6000,
+) -> dict:
+    """
+    Get part of a video's transcript instead of the whole text. Filter by time window
+    (startSeconds/endSeconds) and/or by keywords (query), which returns only the matching
+    segments with some surrounding context. When nextCursor is set, call again with
+    cursor=nextCursor for the following segments.
+    """
+    if cursor and not cursor.isdigit():
+        raise ValueError("Invalid cursor: pass the nextCursor value returned by a previous call.")
+    segments = await get_transcript(videoId, lang)
+    page, next_index = window(
+        segments,
+        start=startSeconds,
+        end=endSeconds,
+        query=query,
+        cursor=int(cursor) if cursor else 0,
+        max_segments=max(1, maxSegments or 50),
+        max_chars=max(1, maxChars or 6000),
+    )
+    return {
+        "videoId": videoId,
+        "totalSegments": len(segments),
+        "durationSeconds": segments[-1]["end"] if segments else 0,
+        "segments": page,
+        "nextCursor": str(next_index) if next_index is not None else None,
+    }
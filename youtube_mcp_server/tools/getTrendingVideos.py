@@ -1,4 +1,8 @@
+from typing import Optional
 from youtube_utils import youtube_get
 
-def run(**kwargs):
-    return youtube_get("getTrendingVideos", kwargs)
+async def run(regionCode: Optional[str] = None, categoryId: Optional[str] = None, maxResults: Optional[int] = 10) -> dict:
+    """Get trending videos, optionally for a region (ISO 3166 code) and video category."""
+    return await youtube_get(
+        "getTrendingVideos", {"regionCode": regionCode, "categoryId": categoryId, "maxResults": maxResults}
+    )
@@ -1,4 +1,11 @@
-from youtube_utils import youtube_get
+from typing import List, Optional
+from youtube_utils import get_videos, parse_video_ids
 
-def run(**kwargs):
-    return youtube_get("getVideoDetails", kwargs)
+async def run(videoIds: Optional[List[str]] = None, videoId: Optional[str] = None) -> dict:
+    """Get title, channel, statistics and duration of one or more videos by ID (videoIds, or a single videoId)."""
+    video_ids = parse_video_ids(videoIds, videoId)
+    videos = await get_videos(video_ids)
+    return {
+        "items": [video for video in videos if video],
+        "notFound": [video_id for video_id, video in zip(video_ids, videos) if not video],
+    }
@@ -1,4 +1,13 @@
-from youtube_utils import youtube_get
+from typing import List, Optional
+from video_stats import engagement_table, table_records
+from youtube_utils import get_video_stats, parse_video_ids
 
-def run(**kwargs):
-    return youtube_get("getVideoEngagementRatio", kwargs)
+async def run(videoIds: Optional[List[str]] = None, videoId: Optional[str] = None) -> dict:
+    """Get like, comment and engagement ratios of one or more videos (videoIds, or a single videoId)."""
+    video_ids = parse_video_ids(videoIds, videoId)
+    rows = await get_video_stats(video_ids)
+    table = engagement_table([row for row in rows if row], sort_by="engagementRatio")
+    return {
+        "items": table_records(table),
+        "notFound": [video_id for video_id, row in zip(video_ids, rows) if not row],
+    }
@@ -1,4 +1,6 @@
+from typing import Optional
 from youtube_utils import youtube_get
 
-def run(**kwargs):
-    return youtube_get("searchVideos", kwargs)
+async def run(query: str, maxResults: Optional[int] = 10) -> dict:
+    """Search YouTube videos matching a query."""
+    return await youtube_get("searchVideos", {"query": query, "maxResults": maxResults})
@@ -0,0 +1,126 @@
+import asyncio
+import re
+from youtube_utils import get_cache
+
+# Transcrições servidas em janelas.
+#
+# A transcrição completa vem do pacote opcional `youtube-transcript-api` e fica no
+# cache em disco (endpoint "transcript", TTL de 7 dias), então janelas seguintes do
+# mesmo vídeo não buscam de novo. Cada chamada devolve só os segmentos pedidos: por
+# intervalo de tempo, por cursor (índice do próximo segmento) e/ou pelos que casam
+# com as palavras de `query`, com um pouco de contexto em volta, até um limite de
+# segmentos e de caracteres.
+
+_inflight = {}
+
+
+class TranscriptsUnavailable(RuntimeError):
+    """O pacote opcional `youtube-transcript-api` não está instalado no servidor."""
+
+
+class TranscriptNotFound(LookupError):
+    """O YouTube não entregou a transcrição do vídeo; `reason` diz o porquê."""
+
+    def __init__(self, video_id, reason):
+        super().__init__(f"No transcript for video {video_id}: {reason}.")
+        self.reason = reason
+
+
+def _download(video_id, languages):
+    try:
+        from youtube_transcript_api import CouldNotRetrieveTranscript, YouTubeTranscriptApi
+    except ImportError:
+        raise TranscriptsUnavailable(
+            "Transcripts are not available on this server: install the `youtube-transcript-api` package."
+        )
+    api = YouTubeTranscriptApi()
+    try:
+        if hasattr(api, "fetch"):
+            return api.fetch(video_id, languages=languages).to_raw_data()
+        return YouTubeTranscriptApi.get_transcript(video_id, languages=languages)
+    except CouldNotRetrieveTranscript as e:
+        # Legendas desativadas, nenhuma no idioma, vídeo indisponível, bloqueio...: a
+        # subclasse é o motivo; a mensagem do pacote é longa e traz instruções de uso.
+        raise TranscriptNotFound(video_id, type(e).__name__) from e
+
+
+async def _request(endpoint, params, etag=None):
+    languages = [params["lang"], "en"] if params.get("lang") else ["en"]
+    raw = await asyncio.to_thread(_download, params["videoId"], languages)
+    segments = [
+        {"start": round(s["start"], 2), "end": round(s["start"] + s.get("duration", 0), 2), "text": s["text"]}
+        for s in raw
+    ]
+    return {"segments": segments}, None
+
+
+async def get_transcript(video_id, lang=None):
+    """Segmentos completos [{start, end, text}], do cache em disco ou baixados uma vez."""
+    params = {"videoId": video_id, "lang": lang}
+    key = (video_id, lang)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(get_cache().fetch("transcript", params, _request))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return (await asyncio.shield(task))["segments"]
+
+
+_SUFFIXES = (("es", "s"), ("ing", "ed"))
+_STOPWORDS = frozenset(
+    "the and for are but not you your yours with this that these those then than there their theirs them they "
+    "what when where which who whom why how was were been being have has had having does did doing from into "
+    "onto over under about above below after before again further once here all any both each few more most "
+    "other some such only own same too very can will just should would could also our ours out off its "
+    "him his her hers she mine down".split()
+)
+
+
+def _stem(word):
+    """
+    Radical aproximado, só para casar a busca com a transcrição: tira o plural, depois
+    -ing/-ed, depois o "e" final (price/prices/priced/pricing -> pric). Radicais com
+    menos de 3 letras ficam inteiros (use/used não casam), e formas irregulares
+    (make/made) não são tratadas.
+    """
+    for suffixes in _SUFFIXES:
+        for suffix in suffixes:
+            if word.endswith(suffix) and not word.endswith("ss") and len(word) - len(suffix) >= 3:
+                word = word[: -len(suffix)]
+                break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def _terms(text):
+    """Radicais das palavras de `text`, sem stopwords."""
+    return {_stem(word) for word in re.findall(r"\w{3,}", text.casefold()) if word not in _STOPWORDS}
+
+
+def matching_segments(segments, query, context=1):
+    """Índices dos segmentos com algum radical de `query` (sem stopwords), com `context` vizinhos de cada lado."""
+    terms = _terms(query)
+    selected = set()
+    for i, segment in enumerate(segments):
+        if terms & _terms(segment["text"]):
+            selected.update(range(max(0, i - context), min(len(segments), i + context + 1)))
+    return sorted(selected)
+
+
+def window(segments, start=None, end=None, query=None, cursor=0, max_segments=50, max_chars=6000, context=1):
+    """Seleciona a página de segmentos; devolve (segmentos, próximo cursor ou None)."""
+    indices = matching_segments(segments, query, context) if query else range(len(segments))
+    indices = [
+        i for i in indices
+        if i >= cursor
+        and (start is None or segments[i]["end"] > start)
+        and (end is None or segments[i]["start"] < end)
+    ]
+    page, chars = [], 0
+    for i in indices:
+        if len(page) >= max_segments or (page and chars + len(segments[i]["text"]) > max_chars):
+            return page, i
+        page.append({"index": i, **segments[i]})
+        chars += len(segments[i]["text"])
+    return page, None
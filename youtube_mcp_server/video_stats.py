@@ -0,0 +1,102 @@
+import os
+import time
+from collections import OrderedDict, Counter
+from typing import Literal, get_args
+
+# Estatísticas de vídeo em memória, para as métricas calculadas localmente.
+#
+# Cada vídeo buscado no recurso `videos` (por getVideoDetails ou qualquer outra
+# ferramenta) deixa aqui título, canal e contagens de views, likes e comentários.
+# getVideoEngagementRatio e compareVideos leem daqui; só os IDs ausentes ou mais
+# velhos que YOUTUBE_STATS_TTL vão ao cache em disco / à API.
+
+STATS_TTL = float(os.getenv("YOUTUBE_STATS_TTL", "900"))
+STATS_MAX_ENTRIES = int(os.getenv("YOUTUBE_STATS_MAX_ENTRIES", "10000"))
+
+COLUMNS = [
+    "rank", "videoId", "title", "channelTitle", "viewCount", "likeCount", "commentCount",
+    "likeRatio", "commentRatio", "engagementRatio",
+]
+SortKey = Literal["viewCount", "likeCount", "commentCount", "likeRatio", "commentRatio", "engagementRatio"]
+SORT_KEYS = get_args(SortKey)
+
+
+class VideoStatsStore:
+    def __init__(self, ttl=STATS_TTL, max_entries=STATS_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = Counter()
+        self._entries = OrderedDict()  # video_id -> (guardado em, linha)
+
+    def put(self, video):
+        statistics = video.get("statistics")
+        if statistics is None:
+            return
+        snippet = video.get("snippet", {})
+        self._entries[video["id"]] = (time.monotonic(), (
+            video["id"],
+            snippet.get("title"),
+            snippet.get("channelTitle"),
+            int(statistics.get("viewCount", 0)),
+            int(statistics.get("likeCount", 0)),
+            int(statistics.get("commentCount", 0)),
+        ))
+        self._entries.move_to_end(video["id"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, video_ids, record=True):
+        """Devolve ({id: linha} dos que estão frescos, [ids que faltam])."""
+        found, missing = {}, []
+        now = time.monotonic()
+        for video_id in video_ids:
+            entry = self._entries.get(video_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                found[video_id] = entry[1]
+            else:
+                missing.append(video_id)
+        if record:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(missing)
+        return found, missing
+
+    def snapshot(self):
+        return {**self.stats, "entries": len(self._entries)}
+
+
+stats_store = VideoStatsStore()
+
+
+def _ratios(numerators, views):
+    return [round(n / v, 6) if v else None for n, v in zip(numerators, views)]
+
+
+def engagement_table(rows, sort_by="viewCount"):
+    """
+    Tabela ranqueada a partir das linhas da store, calculada por colunas de uma vez:
+    {"columns": [...], "rows": [[...], ...]}, ordenada por `sort_by` (decrescente).
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}.")
+    ids, titles, channels, views, likes, comments = (list(column) for column in zip(*rows)) if rows else ([],) * 6
+    table = {
+        "videoId": ids,
+        "title": titles,
+        "channelTitle": channels,
+        "viewCount": views,
+        "likeCount": likes,
+        "commentCount": comments,
+        "likeRatio": _ratios(likes, views),
+        "commentRatio": _ratios(comments, views),
+        "engagementRatio": _ratios([l + c for l, c in zip(likes, comments)], views),
+    }
+    column = table[sort_by]
+    order = sorted(range(len(ids)), key=lambda i: column[i] if column[i] is not None else -1, reverse=True)
+    table["rank"] = [0] * len(ids)
+    for rank, i in enumerate(order, start=1):
+        table["rank"][i] = rank
+    return {"columns": COLUMNS, "rows": [[table[name][i] for name in COLUMNS] for i in order]}
+
+
+def table_records(table):
+    return [dict(zip(table["columns"], row)) for row in table["rows"]]
@@ -1,14 +1,335 @@
+import asyncio
 import httpx
+import importlib.util
+import json
 import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from fixtures import RECORD_DIR, save_fixture
+from observability import logger, upstream_latency, upstream_responses
+from response_cache import ResponseCache
+from video_stats import stats_store
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
-BASE_URL = "https://www.googleapis.com/youtube/v3"
+# Aponte para o mock_backend.py (ex.: http://localhost:5099) para testes de carga sem gastar quota.
+BASE_URL = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
 
-def youtube_get(endpoint: str, params: dict):
-    if not YOUTUBE_API_KEY:
-        raise ValueError("YOUTUBE_API_KEY não definida no ambiente.")
-    params["key"] = YOUTUBE_API_KEY
-    response = httpx.get(f"{BASE_URL}/{endpoint}", params=params)
+# Cliente HTTP compartilhado (keep-alive + HTTP/2 quando o pacote `h2` está instalado),
+# aberto no startup do app e fechado no shutdown.
+HTTP_TIMEOUT = float(os.getenv("YOUTUBE_HTTP_TIMEOUT", "15"))
+MAX_CONNECTIONS = int(os.getenv("YOUTUBE_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("YOUTUBE_MAX_KEEPALIVE", "20"))
+
+# Consultas de vídeo por ID chegando dentro de COALESCE_WINDOW_MS viram uma única
+# chamada ao recurso `videos` (até 50 IDs por chamada).
+COALESCE_WINDOW_MS = float(os.getenv("YOUTUBE_COALESCE_WINDOW_MS", "5"))
+VIDEOS_MAX_IDS = 50
+VIDEO_PARTS = "snippet,statistics,contentDetails"
+
+# Custo em unidades de quota de cada endpoint (o padrão é 1). As ferramentas que
+# usam busca por baixo custam o mesmo que `search`.
+QUOTA_COSTS = {
+    "search": 100,
+    "searchVideos": 100,
+    "getRelatedVideos": 100,
+    "getChannelTopVideos": 100,
+    "captions": 50,
+}
+
+# Limite de quota: balde de tokens em unidades de quota, enchendo YOUTUBE_QUOTA_RATE
+# por segundo até YOUTUBE_QUOTA_BURST, dentro do orçamento diário YOUTUBE_DAILY_QUOTA
+# (que zera à meia-noite do Pacífico, como o da API). Sem saldo, a chamada espera na
+# fila até YOUTUBE_QUOTA_MAX_WAIT segundos; se precisaria esperar mais, se a fila
+# passou de YOUTUBE_QUOTA_MAX_QUEUE ou se o orçamento do dia acabou, é recusada.
+DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+QUOTA_RATE = float(os.getenv("YOUTUBE_QUOTA_RATE", "20"))
+QUOTA_BURST = float(os.getenv("YOUTUBE_QUOTA_BURST", "300"))
+QUOTA_MAX_WAIT = float(os.getenv("YOUTUBE_QUOTA_MAX_WAIT", "10"))
+QUOTA_MAX_QUEUE = int(os.getenv("YOUTUBE_QUOTA_MAX_QUEUE", "200"))
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+_client = None
+_cache = None
+_inflight = {}
+upstream_stats = Counter()
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QuotaLimiter:
+    """Balde de tokens em unidades de quota, com orçamento diário e fila limitada."""
+
+    def __init__(self, rate=QUOTA_RATE, burst=QUOTA_BURST, daily=DAILY_QUOTA,
+                 max_wait=QUOTA_MAX_WAIT, max_queue=QUOTA_MAX_QUEUE):
+        self.rate = rate
+        self.burst = burst
+        self.daily = daily
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.day = self._today()
+        self.used_today = 0
+        self.queue_depth = 0
+        self.stats = Counter()
+
+    def _today(self):
+        return datetime.now(QUOTA_TIMEZONE).date()
+
+    def _seconds_to_reset(self):
+        now = datetime.now(QUOTA_TIMEZONE)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), QUOTA_TIMEZONE)
+        return (midnight - now).total_seconds()
+
+    def _reject(self, reason, retry_after):
+        self.stats[f"rejected.{reason}"] += 1
+        raise QuotaExceeded(f"YouTube quota limit ({reason}); retry in {retry_after:.0f}s.", retry_after)
+
+    def _reserve(self, cost):
+        """Reserva `cost` unidades e devolve quanto esperar; o saldo pode ficar negativo (fila FIFO)."""
+        today = self._today()
+        if today != self.day:
+            self.day, self.used_today = today, 0
+        if self.used_today + cost > self.daily:
+            self._reject("daily", self._seconds_to_reset())
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (cost - self.tokens) / self.rate)
+        if wait > 0 and (wait > self.max_wait or self.queue_depth >= self.max_queue):
+            self._reject("rate", wait)
+        self.tokens -= cost
+        self.used_today += cost
+        return wait
+
+    async def acquire(self, cost):
+        wait = self._reserve(cost)
+        if wait <= 0:
+            return
+        self.stats["queued"] += 1
+        self.stats["waited_s"] += wait
+        self.queue_depth += 1
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            self.queue_depth -= 1
+
+    def exhaust(self):
+        """A API respondeu quotaExceeded: não gasta mais nada até a virada do dia."""
+        self.used_today = self.daily
+
+    def snapshot(self):
+        # Só leitura: calcula saldo e virada do dia sem reservar nem recusar nada.
+        used_today = self.used_today if self._today() == self.day else 0
+        tokens = min(self.burst, self.tokens + (time.monotonic() - self.updated) * self.rate)
+        return {
+            **self.stats,
+            "daily_limit": self.daily,
+            "used_today": used_today,
+            "remaining_today": max(0, self.daily - used_today),
+            "tokens": round(tokens, 2),
+            "queue_depth": self.queue_depth,
+        }
+
+
+limiter = QuotaLimiter()
+
+
+def create_client():
+    return httpx.AsyncClient(
+        base_url=BASE_URL,
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+    )
+
+
+async def open_client():
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+async def close_client():
+    global _client, _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _quota_error(response):
+    if response.status_code != 403:
+        return False
+    try:
+        errors = response.json()["error"]["errors"]
+    except (ValueError, KeyError, TypeError):
+        return False
+    return any(e.get("reason") in ("quotaExceeded", "dailyLimitExceeded") for e in errors)
+
+
+async def _send(endpoint: str, params: dict, etag=None):
+    cost = QUOTA_COSTS.get(endpoint, 1)
+    await limiter.acquire(cost)
+    client = await open_client()
+    upstream_stats[f"calls.{endpoint}"] += 1
+    upstream_stats["quota_units"] += cost
+    headers = {"If-None-Match": etag} if etag else None
+    start = time.perf_counter()
+    try:
+        response = await client.get(f"/{endpoint}", params={**params, "key": YOUTUBE_API_KEY}, headers=headers)
+    except httpx.HTTPError as e:
+        upstream_responses.inc(endpoint=endpoint, status=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        upstream_latency.observe(elapsed, endpoint=endpoint)
+    upstream_responses.inc(endpoint=endpoint, status=response.status_code)
+    logger.info("upstream endpoint=%s status=%s duration_ms=%.1f", endpoint, response.status_code, elapsed * 1000)
+    if response.status_code == 304:
+        return None, etag
+    if _quota_error(response):
+        limiter.exhaust()
     response.raise_for_status()
-    return response.json()
+    body = response.json()
+    if RECORD_DIR:
+        save_fixture(RECORD_DIR, endpoint, params, body)
+    return body, response.headers.get("ETag")
+
+
+async def _request(endpoint: str, params: dict, etag=None):
+    """
+    GET condicional: devolve (corpo, etag), com corpo None quando a API responde 304.
+    Pedidos idênticos em andamento compartilham a mesma chamada (single-flight).
+    """
+    key = (endpoint, json.dumps(params, sort_keys=True, default=str), etag)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_send(endpoint, params, etag))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        upstream_stats["deduplicated"] += 1
+    # shield: um chamador cancelado não derruba a chamada dos outros.
+    return await asyncio.shield(task)
+
+
+async def youtube_get(endpoint: str, params: dict):
+    if not YOUTUBE_API_KEY:
+        raise RuntimeError("YOUTUBE_API_KEY não definida no ambiente.")
+    params = {k: v for k, v in params.items() if v is not None}
+    return await get_cache().fetch(endpoint, params, _request)
+
+
+class VideoLookupCoalescer:
+    """Agrupa consultas de vídeo por ID numa janela curta e distribui os resultados."""
+
+    def __init__(self, window=COALESCE_WINDOW_MS / 1000, max_batch=VIDEOS_MAX_IDS):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # part -> {video_id: [futures]}
+        self._timers = {}
+        self._tasks = set()
+
+    async def get(self, video_id, part=VIDEO_PARTS):
+        future = asyncio.get_running_loop().create_future()
+        waiting = self._pending.setdefault(part, {})
+        waiting.setdefault(video_id, []).append(future)
+        if len(waiting) >= self.max_batch:
+            self._flush(part)
+        elif part not in self._timers:
+            self._timers[part] = asyncio.get_running_loop().call_later(self.window, self._flush, part)
+        return await future
+
+    def _flush(self, part):
+        timer = self._timers.pop(part, None)
+        if timer is not None:
+            timer.cancel()
+        waiting = self._pending.pop(part, None)
+        if waiting:
+            task = asyncio.create_task(self._fetch(part, waiting))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, part, waiting):
+        upstream_stats["coalesced_batches"] += 1
+        upstream_stats["coalesced_ids"] += len(waiting)
+        try:
+            body, _ = await _request("videos", {"part": part, "id": ",".join(waiting), "maxResults": len(waiting)})
+            found = {item["id"]: item for item in body.get("items", [])}
+        except Exception as e:
+            for futures in waiting.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for video_id, futures in waiting.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(video_id))
+
+
+_coalescer = VideoLookupCoalescer()
+
+
+async def _coalesced_request(endpoint: str, params: dict, etag=None):
+    # O lote não leva If-None-Match (o ETag é de cada vídeo), então a revalidação
+    # compara o ETag do item: igual ao do cache conta como 304 e só renova a entrada.
+    item = await _coalescer.get(params["id"], params["part"])
+    new_etag = item.get("etag") if item else None
+    if etag and new_etag == etag:
+        return None, etag
+    return {"items": [item] if item else []}, new_etag
+
+
+async def get_video(video_id: str, part: str = VIDEO_PARTS):
+    """Um vídeo pelo ID (ou None), via cache por ID e coalescedor de chamadas ao recurso `videos`."""
+    if not YOUTUBE_API_KEY:
+        raise RuntimeError("YOUTUBE_API_KEY não definida no ambiente.")
+    body = await get_cache().fetch("videos", {"id": video_id, "part": part}, _coalesced_request)
+    if not body["items"]:
+        return None
+    stats_store.put(body["items"][0])
+    return body["items"][0]
+
+
+async def get_videos(video_ids, part: str = VIDEO_PARTS):
+    return await asyncio.gather(*(get_video(video_id, part) for video_id in video_ids))
+
+
+async def get_video_stats(video_ids):
+    """Linhas da store de estatísticas na ordem de `video_ids` (None se o vídeo não existe)."""
+    found, missing = stats_store.get_many(video_ids)
+    if missing:
+        await get_videos(missing)
+        found.update(stats_store.get_many(missing, record=False)[0])
+    return [found.get(video_id) for video_id in video_ids]
+
+
+def parse_video_ids(*values):
+    """IDs de listas ou de textos separados por vírgulas (None é ignorado), sem repetir."""
+    ids = []
+    for value in values:
+        if isinstance(value, str):
+            value = value.split(",")
+        ids.extend(v.strip() for v in value or () if v and v.strip())
+    if not ids:
+        raise ValueError("Informe ao menos um ID em videoIds ou videoId.")
+    return list(dict.fromkeys(ids))